@@ -1,12 +1,40 @@
+import email.utils
+import functools
+import hashlib
+import http.client
 import json
+import os
 import random
+import re
+import ssl
+import tempfile
+import threading
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import urllib.parse
 import urllib.request
 import urllib.error
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional accelerator; stdlib json is the fallback
+    orjson = None  # type: ignore[assignment]
+
+_JSON_CT = "application/json"
+_REDIRECT_CODES = frozenset({301, 302, 303, 307, 308})
+_MAX_REDIRECTS = 10  # same limit as urllib's HTTPRedirectHandler
+_SECONDARY_RL_RE = re.compile(rb"secondary rate limit|abuse detection", re.IGNORECASE)
+_JSON_WS_RE = re.compile(rb"[ \t\r\n]")
+_COMPACT_SCAN_BYTES = 4096
+_STALE_CONN_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+# Only these may be resent after a stale keep-alive socket: the server may already have acted on
+# the first attempt (RFC 9110, 9.2.2)
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE"})
+
 
 class RateLimitExceeded(RuntimeError):
     """Raised when we determine a response indicates rate limiting and retries are exhausted."""
@@ -15,35 +43,301 @@ class RateLimitExceeded(RuntimeError):
         super().__init__(f"Rate limit exceeded (HTTP {status}) for {url}: {message}")
         self.url = url
         self.status = status
+        self.message = message
         self.retry_after = retry_after
 
+    def __reduce__(self):
+        # args holds the formatted text only; rebuild from the fields so copy/pickle work
+        return type(self), (self.url, self.status, self.message, self.retry_after)
+
+
+class HttpRequestError(urllib.error.HTTPError, RuntimeError):
+    """
+    Raised for non-2xx responses that are not rate limiting; carries the already-read body.
+    An urllib.error.HTTPError (code, reason, headers, url), so callers catching HTTPError or
+    URLError keep working; .status mirrors .code.
+    """
+
+    def __init__(self, url: str, status: int, reason: str = "", body: str = "",
+                 headers: Optional[Dict[str, str]] = None):
+        # HTTPError exposes headers as a message (case-insensitive get()); no fp, the body was
+        # already read and is kept as text in .body
+        hdrs = http.client.HTTPMessage()
+        for name, value in (headers or {}).items():
+            hdrs[name] = value
+        super().__init__(url, status, reason, hdrs, None)
+        self.body = body
+
+    def __str__(self) -> str:
+        return f"HTTP {self.code} ({self.reason}) for {self.url}: {self.body}"
+
+    def __reduce__(self):
+        return type(self), (self.url, self.code, self.reason, self.body, dict(self.headers.items()))
+
+
+@functools.lru_cache(maxsize=None)
+def _ssl_context() -> ssl.SSLContext:
+    # Loading the CA bundle is costly; build the context once and share it across connections
+    return ssl.create_default_context()
+
+
+@functools.lru_cache(maxsize=None)
+def _urllib_opener() -> urllib.request.OpenerDirector:
+    return urllib.request.build_opener(urllib.request.HTTPSHandler(context=_ssl_context()))
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_compact(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+class ConnectionPool:
+    """Thread-safe pool of idle keep-alive connections keyed by (scheme, host, port)."""
+
+    def __init__(self, maxsize: int = 16) -> None:
+        self.maxsize = maxsize
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, host: str, port: int,
+                timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused); reused connections may have been closed by the server."""
+        with self._lock:
+            idle = self._idle.get((scheme, host, port))
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=_ssl_context()), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def release(self, scheme: str, host: str, port: int, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host, port), [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class HostThrottle:
+    """
+    Per-host request state shared by every client it is passed to: a cap on concurrent requests
+    to one host, and the monotonic time a rate-limited host may be hit again.
+    """
+
+    def __init__(self, max_per_host: int = 16) -> None:
+        self.max_per_host = max_per_host
+        self._next_ok: Dict[str, float] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, host: str) -> threading.BoundedSemaphore:
+        """Semaphore to hold while a request to 'host' is in flight."""
+        with self._lock:
+            sem = self._slots.get(host)
+            if sem is None:
+                sem = self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return sem
+
+    def wait(self, host: str) -> None:
+        with self._lock:
+            next_ok = self._next_ok.get(host, 0.0)
+        delay = next_ok - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, host: str, sleep_s: float) -> None:
+        until = time.monotonic() + max(0.0, sleep_s)
+        with self._lock:
+            if until > self._next_ok.get(host, 0.0):
+                self._next_ok[host] = until
+
+
+class ResponseCache:
+    """Thread-safe LRU of validated GET responses: key -> (content_type, body, etag, last_modified)."""
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Any, Tuple[str, bytes, Optional[str], Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Tuple[str, bytes, Optional[str], Optional[str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Any, entry: Tuple[str, bytes, Optional[str], Optional[str]]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskResponseCache(ResponseCache):
+    """
+    ResponseCache whose entries are also kept as files under a directory, so validators survive
+    between runs and a repeat scan costs mostly 304s. Keys include the request headers, hence the
+    auth token: entries never leak between credentials. Disk I/O errors only cost a cache miss.
+    """
+
+    def __init__(self, directory: str, maxsize: int = 256) -> None:
+        super().__init__(maxsize)
+        self.directory = directory
+
+    def _path(self, key: Any) -> str:
+        # frozenset order varies between processes; sort so the digest is stable
+        stable = tuple(sorted(k) if isinstance(k, frozenset) else k for k in key)
+        digest = hashlib.sha256(repr(stable).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key: Any) -> Optional[Tuple[str, bytes, Optional[str], Optional[str]]]:
+        entry = super().get(key)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(key), "rb") as fh:
+                meta, body = fh.read().split(b"\n", 1)
+            ctype, etag, last_modified = json.loads(meta)
+        except (OSError, ValueError):
+            return None
+        entry = (ctype, body, etag, last_modified)
+        super().put(key, entry)
+        return entry
+
+    def put(self, key: Any, entry: Tuple[str, bytes, Optional[str], Optional[str]]) -> None:
+        super().put(key, entry)
+        path = self._path(key)
+        ctype, body, etag, last_modified = entry
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(json.dumps([ctype, etag, last_modified]).encode("utf-8") + b"\n")
+                fh.write(body)
+            os.replace(tmp, path)  # readers never see a partial entry
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
 
 @dataclass
 class HttpClient:
-    """HTTP client with rate-limit-aware retry logic (stdlib only)."""
+    """HTTP client with rate-limit-aware retry logic and keep-alive connection reuse (stdlib only)."""
     max_retries: int = 5
     max_sleep: float = 60.0
     timeout: float = 15.0
     user_agent: str = "HttpClient/1.0"
+    backoff_base: float = 1.0
+    rng: random.Random = field(default_factory=random.Random, repr=False, compare=False)
+    cache_size: int = 256  # cached GET responses revalidated via ETag/Last-Modified; 0 disables
+    # Pass shared instances to let several clients reuse sockets and cached responses, and
+    # respect one another's per-host concurrency cap and rate-limit backoff
+    pool: Optional[ConnectionPool] = field(default=None, repr=False, compare=False)
+    response_cache: Optional[ResponseCache] = field(default=None, repr=False, compare=False)
+    throttle: Optional[HostThrottle] = field(default=None, repr=False, compare=False)
+
+    _pool: ConnectionPool = field(init=False, repr=False)
+    _cache: Optional[ResponseCache] = field(init=False, repr=False)
+    _default_headers: Dict[str, str] = field(init=False, repr=False)
+    _throttle: HostThrottle = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._pool = self.pool if self.pool is not None else ConnectionPool()
+        if self.cache_size <= 0:
+            self._cache = None
+        else:
+            self._cache = self.response_cache if self.response_cache is not None else ResponseCache(self.cache_size)
+        # Shared read-only template; copied only when the caller passes extra headers
+        self._default_headers = {"User-Agent": self.user_agent}
+        self._throttle = self.throttle if self.throttle is not None else HostThrottle(self._pool.maxsize)
 
     # -------- Public API --------
 
     def get_json(self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
         """GET a URL and parse JSON if possible; otherwise return text."""
-        ctype, text = self._do_request("GET", url, headers=headers)
-        return self._json_or_text(ctype, text)
+        ctype, body, _ = self._do_request("GET", url, headers=headers)
+        return self._json_or_text(ctype, body)
+
+    def get_json_with_headers(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[Any, Any]:
+        """
+        Like get_json, but also return the response headers (case-insensitive get(), e.g. for Link or
+        X-Total-Pages). For a revalidated cached response these are the 304's headers.
+        """
+        ctype, body, resp_headers = self._do_request("GET", url, headers=headers)
+        return self._json_or_text(ctype, body), resp_headers
+
+    def get_many_json(self, urls: Iterable[str], headers: Optional[Dict[str, str]] = None,
+                      max_workers: int = 8, max_per_host: Optional[int] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        GET several URLs concurrently and yield (url, parsed_json) in completion order.
+        Workers share this client's connection pool, and every request counts against the
+        throttle's per-host cap (shared with other clients using the same throttle); max_per_host
+        additionally caps this call alone. A failing URL (e.g. RateLimitExceeded) raises when its
+        result is reached.
+        """
+        semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        sem_lock = threading.Lock()
+
+        def fetch(u: str) -> Any:
+            if max_per_host is None:
+                return self.get_json(u, headers)
+            host = urllib.parse.urlsplit(u).netloc
+            with sem_lock:
+                sem = semaphores.setdefault(host, threading.BoundedSemaphore(max_per_host))
+            with sem:
+                return self.get_json(u, headers)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {executor.submit(fetch, u): u for u in urls}
+            for fut in as_completed(futures):
+                yield futures[fut], fut.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
     def get_text(self, url: str, headers: Optional[Dict[str, str]] = None) -> str:
         """GET a URL and return text (JSON responses are serialized to text)."""
-        ctype, text = self._do_request("GET", url, headers=headers)
-        if "application/json" in (ctype or "") and text:
-            # Coerce JSON to a compact string for text consumers
+        ctype, body, _ = self._do_request("GET", url, headers=headers)
+        if _JSON_CT in ctype and body:
+            # Coerce JSON to a compact string for text consumers. Servers like GitHub already send
+            # compact JSON; if the head of the body has no whitespace, skip the parse/serialize trip.
+            if not _JSON_WS_RE.search(body, 0, _COMPACT_SCAN_BYTES):
+                return body.decode("utf-8", "replace")
             try:
-                obj = json.loads(text)
-                return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+                return _json_dumps_compact(_json_loads(body))
             except Exception:  # noqa
                 pass
-        return text
+        return body.decode("utf-8", "replace")
 
     def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
                 data: Optional[bytes] = None) -> Tuple[str, str]:
@@ -51,77 +345,186 @@ class HttpClient:
         Generic request. Returns (content_type, text_body).
         Method should be 'GET' for most rate-limited APIs; POST works too.
         """
-        return self._do_request(method.upper(), url, headers=headers, data=data)
+        ctype, body, _ = self._do_request(method.upper(), url, headers=headers, data=data)
+        return ctype, body.decode("utf-8", "replace")
+
+    def close(self) -> None:
+        """Close idle keep-alive connections held by this client (all users' if the pool is shared)."""
+        self._pool.close()
 
     # -------- Core logic --------
 
     def _do_request(self, method: str, url: str, headers: Optional[Dict[str, str]],
-                    data: Optional[bytes] = None) -> tuple[str | Any, Any] | None:
+                    data: Optional[bytes] = None) -> Tuple[str, bytes, Any]:
+        """
+        Core request loop. Returns (content_type, body_bytes, response_headers); consumers decode
+        only if they need str.
+        """
         attempt = 0
-        hdrs = dict(headers or {})
-        hdrs.setdefault("User-Agent", self.user_agent)
+        hdrs = {**self._default_headers, **headers} if headers else self._default_headers
+
+        cache_key = None
+        cached = None
+        if self._cache is not None and method == "GET":
+            cache_key = (method, url, frozenset(hdrs.items()))
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                # Revalidate: a 304 costs no body transfer (and no GitHub rate-limit budget)
+                hdrs = dict(hdrs)
+                if cached[2]:
+                    hdrs["If-None-Match"] = cached[2]
+                if cached[3]:
+                    hdrs["If-Modified-Since"] = cached[3]
 
+        # Parse once; retries reuse the split URL instead of re-deriving it per attempt
+        parts = urllib.parse.urlsplit(url)
+        host = parts.netloc
+        throttle = self._throttle
         while True:
+            throttle.wait(host)
             try:
-                req = urllib.request.Request(url, headers=hdrs, method=method, data=data)
-                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-                    ctype = resp.headers.get("Content-Type", "") or ""
-                    body = resp.read().decode("utf-8", "replace")
-                    return ctype, body
-
-            except urllib.error.HTTPError as e:
-                # Read body safely (HTTPError is also a file-like)
-                ctype, text = self._decode_error_body(e)
-
-                if self._is_rate_limited(e.code, e.headers, text):
-                    if attempt >= self.max_retries:
-                        raise RateLimitExceeded(
-                            e.url, e.code, message=(text or "")[:300],
-                            retry_after=self._decide_sleep_seconds(e.headers, attempt)
-                        ) from None
-
-                    sleep_s = self._decide_sleep_seconds(e.headers, attempt)
-                    time.sleep(max(0.0, sleep_s))
-                    attempt += 1
-                    continue
-
-                # Not a rate-limit case -> bubble up with compact message
-                msg = (text or "").strip()[:300]
-                raise urllib.error.HTTPError(e.url, e.code, f"{e.reason} (body: {msg})", e.headers, e.fp)
-
-            except urllib.error.URLError:
+                with throttle.slot(host):
+                    status, reason, resp_headers, body, final_url = self._send(method, url, hdrs, data, parts)
+            except (OSError, http.client.HTTPException):
                 # Network/transient: retry with backoff
                 if attempt >= self.max_retries:
                     raise
-                sleep_s = min(self.max_sleep, (2 ** attempt) + random.uniform(0, 0.5))
-                time.sleep(sleep_s)
+                sleep_s = self._backoff_seconds(attempt)
+                if sleep_s > 0:
+                    time.sleep(sleep_s)
                 attempt += 1
                 continue
 
+            ctype: str = resp_headers.get("Content-Type") or ""  # always a str; consumers rely on it
+            if 200 <= status < 300:
+                if cache_key is not None and self._cache is not None:
+                    etag = resp_headers.get("ETag")
+                    last_modified = resp_headers.get("Last-Modified")
+                    if etag or last_modified:
+                        self._cache.put(cache_key, (ctype, body, etag, last_modified))
+                return ctype, body, resp_headers
+            if status == 304 and cached is not None:
+                return cached[0], cached[1], resp_headers
+
+            if self._is_rate_limited(status, resp_headers, body):
+                if attempt >= self.max_retries:
+                    raise RateLimitExceeded(
+                        final_url, status, message=body[:300].decode("utf-8", "replace"),
+                        retry_after=self._decide_sleep_seconds(resp_headers, attempt)
+                    ) from None
+
+                # Throttle the host rather than just this call, so other threads hitting the
+                # same host back off too while requests to other hosts keep flowing
+                throttle.defer(host, self._decide_sleep_seconds(resp_headers, attempt))
+                attempt += 1
+                continue
+
+            # Not a rate-limit case -> bubble up with compact message
+            msg = body.strip()[:300].decode("utf-8", "replace")
+            raise HttpRequestError(final_url, status, reason, msg,
+                                   dict(resp_headers.items()) if resp_headers else {}) from None
+
+    # -------- Transport --------
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], data: Optional[bytes],
+              parts: Optional[urllib.parse.SplitResult] = None) -> Tuple[int, str, Any, bytes, str]:
+        """Issue one request, following redirects. Returns (status, reason, headers, body, final_url)."""
+        redirects = 0
+        while True:
+            if parts is None:
+                parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ("http", "https") or self._proxied(parts):
+                # Leave proxies and exotic schemes to urllib's handler chain (redirects included)
+                return self._send_urllib(method, url, headers, data)
+
+            status, reason, resp_headers, body = self._send_pooled(method, parts, headers, data)
+            location = resp_headers.get("Location")
+            if status not in _REDIRECT_CODES or not location or redirects >= _MAX_REDIRECTS:
+                return status, reason, resp_headers, body, url
+
+            target = urllib.parse.urljoin(url, location)
+            if urllib.parse.urlsplit(target).netloc != parts.netloc:
+                # Do not leak credentials to a different host
+                headers = {k: v for k, v in headers.items() if k.lower() not in ("authorization", "private-token")}
+            if status == 303 or (status in (301, 302) and method not in ("GET", "HEAD")):
+                method, data = "GET", None
+            url, parts = target, None
+            redirects += 1
+
+    def _send_pooled(self, method: str, parts: urllib.parse.SplitResult, headers: Dict[str, str],
+                     data: Optional[bytes]) -> Tuple[int, str, Any, bytes]:
+        scheme = parts.scheme
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+        while True:
+            conn, reused = self._pool.acquire(scheme, host, port, self.timeout)
+            try:
+                conn.request(method, target, body=data, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except _STALE_CONN_ERRORS:
+                conn.close()
+                if reused and method.upper() in _IDEMPOTENT_METHODS:
+                    # The server dropped an idle keep-alive socket; retry on a fresh one
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._pool.release(scheme, host, port, conn)
+            return resp.status, resp.reason, resp.headers, body
+
+    def _send_urllib(self, method: str, url: str, headers: Dict[str, str],
+                     data: Optional[bytes]) -> Tuple[int, str, Any, bytes, str]:
+        req = urllib.request.Request(url, headers=headers, method=method, data=data)
+        try:
+            with _urllib_opener().open(req, timeout=self.timeout) as resp:
+                # Non-HTTP handlers (file:, ftp:) do not report a status line
+                status = getattr(resp, "status", None) or 200
+                return status, getattr(resp, "reason", "OK"), resp.headers, resp.read(), resp.geturl()
+        except urllib.error.HTTPError as e:
+            # HTTPError is also a file-like
+            _, body = self._read_error_body(e)
+            return e.code, e.reason, e.headers, body, e.url
+
+    @staticmethod
+    def _proxied(parts: urllib.parse.SplitResult) -> bool:
+        proxies = urllib.request.getproxies()
+        if parts.scheme not in proxies:
+            return False
+        return not urllib.request.proxy_bypass(parts.hostname or "")
+
     # -------- Helpers --------
 
     @staticmethod
-    def _json_or_text(ctype: str, text: str) -> Any:
-        if "application/json" in (ctype or ""):
-            return json.loads(text)
+    def _json_or_text(ctype: str, body: bytes) -> Any:
+        # json.loads accepts bytes directly, which skips building an intermediate str
+        if _JSON_CT in ctype:
+            return _json_loads(body)
         try:
-            return json.loads(text)
+            return _json_loads(body)
         except Exception:  # noqa
-            return text
+            return body.decode("utf-8", "replace")
 
     @staticmethod
-    def _decode_error_body(e: urllib.error.HTTPError) -> Tuple[str, str]:
+    def _read_error_body(e: urllib.error.HTTPError) -> Tuple[str, bytes]:
         try:
             ctype = e.headers.get("Content-Type", "") if e.headers else ""
-            body = e.read().decode("utf-8", "replace") if e.fp else ""
-            return ctype or "", body or ""
+            body = e.read() if e.fp else b""
+            return ctype or "", body or b""
         except Exception:  # noqa
-            return "", ""
+            return "", b""
 
     @staticmethod
-    def _looks_like_secondary_rl(body_text: str) -> bool:
-        s = (body_text or "").lower()
-        return ("secondary rate limit" in s) or ("abuse detection" in s)
+    def _looks_like_secondary_rl(body: bytes) -> bool:
+        # Scan the raw bytes case-insensitively instead of lowercasing a copy of the whole body
+        return bool(_SECONDARY_RL_RE.search(body))
 
     @staticmethod
     def _parse_retry_after(headers: Optional[Dict[str, str]]) -> Optional[float]:
@@ -135,7 +538,9 @@ class HttpClient:
             return max(0.0, float(ra))
         # RFC 7231 IMF-fixdate, e.g., 'Wed, 21 Oct 2015 07:28:00 GMT'
         try:
-            dt = datetime.strptime(ra, "%a, %d %b %Y %H:%M:%S %Z").replace(tzinfo=timezone.utc)
+            dt = email.utils.parsedate_to_datetime(ra)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
             return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
         except Exception:  # noqa
             return None
@@ -145,22 +550,25 @@ class HttpClient:
         if not headers:
             return None
         for k in ("X-RateLimit-Reset", "RateLimit-Reset"):
-            v = headers.get(k)
-            if v and v.strip().isdigit():
-                reset_ts = int(v.strip())
-                return max(0.0, reset_ts - int(time.time()))
+            value = headers.get(k)
+            if value is None:
+                continue
+            try:
+                reset_ts = int(value)  # int() tolerates surrounding whitespace
+            except ValueError:
+                continue
+            # Keep fractional seconds for better sleep precision
+            return max(0.0, reset_ts - time.time())
         return None
 
-    def _is_rate_limited(self, status: int, headers, body_text: Optional[str]) -> bool:
+    def _is_rate_limited(self, status: int, headers, body: Optional[bytes]) -> bool:
         if status == 429:
             return True
         if status == 403:
-            h = {k.lower(): v for k, v in (headers.items() if headers else [])}
-            if h.get("x-ratelimit-remaining") == "0":
+            # Response headers are http.client.HTTPMessage, whose get() is already case-insensitive
+            if headers and "0" in (headers.get("X-RateLimit-Remaining"), headers.get("RateLimit-Remaining")):
                 return True
-            if "ratelimit-remaining" in h and h["ratelimit-remaining"] == "0":
-                return True
-            if self._looks_like_secondary_rl(body_text or ""):
+            if self._looks_like_secondary_rl(body or b""):
                 return True
         return False
 
@@ -170,6 +578,13 @@ class HttpClient:
         if wait is None:
             wait = self._parse_reset_epoch(headers)
         if wait is not None:
+            # Hints are wall-clock deltas; clamp so a clock step can't yield negative or runaway
+            # sleeps. The result is then applied on the monotonic clock (see HostThrottle.defer).
             return min(self.max_sleep, max(0.0, wait))
         # Fallback: exponential backoff with jitter
-        return min(self.max_sleep, (2 ** attempt) + random.uniform(0, 0.5))
+        return self._backoff_seconds(attempt)
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        # Full jitter: spread retries over [0, cap] so concurrent clients don't wake in lockstep
+        cap = min(self.max_sleep, self.backoff_base * (2 ** attempt))
+        return self.rng.uniform(0, cap)
@@ -1,27 +1,116 @@
 import copy
+import io
+import json
 import os
+import re
 import shutil
 import sys
 import tempfile
 import yaml
 import warnings
-from typing import Any, Dict, Union, Optional, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Union, Optional, Iterable, TextIO
+from _http_client import HttpRequestError, RateLimitExceeded
 from _repo_remote_layer_scanner import RemoteLayerScanner
 from _yaml_dumper import YamlDumper
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional accelerator for JSON output; stdlib json is the fallback
+    orjson = None  # type: ignore[assignment]
+
 _DEFAULT_VERSION = 14
 
+# Upper bound on concurrent layer scans (network-bound; also bounded by host rate limits)
+_MAX_DISCOVERY_WORKERS = 32
+
 # List of substrings to exclude from layers
 _LAYER_FILTER_SUBSTRS = [
     "bitbake/lib/layerindexlib/tests/testdata",
     "tests/"
 ]
+_LAYER_FILTER_RE = re.compile("|".join(re.escape(s) for s in _LAYER_FILTER_SUBSTRS))
+
+# One match classifies a revision (commit = full SHA-1/SHA-256 id); the group that matched names
+# its kind. Values are what rev.split("/", 2)[-1] gives, so 'origin/<x>/<branch>' keeps '<branch>'.
+_REV_RE = re.compile(
+    r"refs/tags/(?P<tag>.*)"
+    r"|(?:refs/heads/|origin/(?:[^/]*/)?)(?P<branch>.*)"
+    r"|(?P<commit>[0-9a-fA-F]{40}|[0-9a-fA-F]{64})\Z",
+    re.S,
+)
+
+# Top-level keys copied verbatim, in output order, with the kas format version that introduced them
+_PASSTHROUGH_KEYS = (
+    ("build_system", 10),
+    ("bblayers_conf_header", 1),  # headers are always accepted
+    ("local_conf_header", 1),
+    ("menu_configuration", 1),
+    ("artifacts", 17),
+    ("signers", 19),
+)
+
+# Horizontal rule framing the source comment header
+_COMMENT_RULE = "# " + "-" * 77
+
+# Allowed by spec: accepted spelling -> canonical kas value
+_BUILD_SYSTEM_MAP = {"openembedded": "openembedded", "oe": "openembedded", "isar": "isar"}
+
+# (url, refspec) -> detected layers, or the (traceback-free) exception a discovery failed with.
+# Manifests often point many projects at the same repo/revision; scan each pair once per process.
+_LAYER_CACHE: dict[tuple[str, str | None], list[str] | None | BaseException] = {}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Failures that may pass on their own (rate limits, 5xx, network errors); never cached."""
+    if isinstance(exc, HttpRequestError):
+        # Rate-limited 403/429 responses surface as RateLimitExceeded; a plain 429 still counts
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, (RateLimitExceeded, OSError))
+
+
+def _detached_copy(exc: BaseException) -> BaseException:
+    """A copy of 'exc' without its traceback, so repeated raises do not keep extending it."""
+    try:
+        fresh = copy.copy(exc)
+    except Exception:  # noqa: BLE001 - not copyable; reuse the object itself
+        fresh = exc
+    return fresh.with_traceback(None)
+
+
+def _forget_layer_failures() -> None:
+    """Drop cached discovery failures so the next lookup of those repos scans again."""
+    for key in [k for k, v in _LAYER_CACHE.items() if isinstance(v, BaseException)]:
+        _LAYER_CACHE.pop(key, None)
+
 
-# Allowed by spec
-_BUILD_SYSTEMS = {"openembedded", "oe", "isar"}
+# pygit2 module once imported, False if unavailable, None before the first clone fallback.
+# Only the rare clone fallback needs it, so the import is deferred.
+_PYGIT2: Any = None
 
 
 def _discover_layers(url: str, refspec: str | None) -> list[str] | None:
+    """
+    Memoized wrapper around _scan_layers. Deterministic failures (bad URL, unknown repo or rev,
+    ...) are cached and re-raised as copies of the original exception; transient ones are retried.
+    """
+    key = (url, refspec)
+    if key in _LAYER_CACHE:
+        cached = _LAYER_CACHE[key]
+        if isinstance(cached, BaseException):
+            raise _detached_copy(cached)
+        return list(cached) if cached is not None else None
+    try:
+        layers = _scan_layers(url, refspec)
+    except Exception as exc:  # noqa: BLE001 - cached unless transient, then re-raised
+        if not _is_transient(exc):
+            _LAYER_CACHE[key] = _detached_copy(exc)
+        raise
+    _LAYER_CACHE[key] = layers
+    return list(layers) if layers is not None else None
+
+
+def _scan_layers(url: str, refspec: str | None) -> list[str] | None:
     """
     Populate the minimal fields the exporter expects, discovering layers from REMOTE repos:
       - bblayers_conf_header: {} (left empty)
@@ -40,11 +129,23 @@ def _discover_layers(url: str, refspec: str | None) -> list[str] | None:
         raise
 
 
+def _get_pygit2() -> Any:
+    """Import pygit2 on first use and remember the outcome; returns None when unavailable."""
+    global _PYGIT2
+    if _PYGIT2 is None:
+        try:
+            import pygit2  # type: ignore
+        except ImportError:
+            _PYGIT2 = False
+        else:
+            _PYGIT2 = pygit2
+    return _PYGIT2 or None
+
+
 def _discover_layers_via_clone(url: str, refspec: str | None, original_exc: Exception) -> list[str] | None:
     """Fallback: clone the repo locally (pygit2) and scan the checkout for layers."""
-    try:
-        import pygit2  # type: ignore
-    except ImportError:
+    pygit2 = _get_pygit2()
+    if pygit2 is None:
         print(
             f"  Layer discovery failed for {url}: {original_exc} (pygit2 unavailable)",
             file=sys.stderr,
@@ -101,21 +202,56 @@ def _checkout_clone_to_ref(repo, refspec: str | None, pygit2_mod) -> None:
             repo.set_head(obj.id)
 
 
+def _classify_revision(rev: str) -> tuple[str, str]:
+    """Classify a repo-manifest revision as ('tag' | 'branch' | 'commit' | 'other', value)."""
+    m = _REV_RE.match(rev)
+    if m is None or m.lastgroup is None:
+        return "other", rev
+    kind = m.lastgroup
+    return kind, m.group(kind)
+
+
+# Version strings of the pre-numbered kas format
+_LEGACY_VERSIONS = {"0.10": 1, "0": 1, "1.0": 1}
+
+
 def _coerce_version(version: Union[int, str]) -> int:
     if isinstance(version, int):
         v = version
     else:
         s = str(version).strip()
-        if s in {"0.10", "0", "1.0"}:
-            v = 1
+        legacy = _LEGACY_VERSIONS.get(s)
+        if legacy is not None:
+            v = legacy
         else:
             try:
-                v = int(float(s))
+                v = int(s)  # the usual case: a plain number, no float round trip
             except ValueError:
-                v = int(s)
+                try:
+                    v = int(float(s))
+                except ValueError:
+                    raise ValueError(f"invalid literal for int() with base 10: {s!r}") from None
     return max(1, min(20, v))
 
 
+def _parse_include_layer(entry: Any) -> Optional[tuple[Optional[str], str]]:
+    """
+    Split one include_layers entry into (repo or None, layer); None for a blank entry.
+    Raises ValueError unless it is 'repo:layer' or 'layer'.
+    """
+    raw = str(entry).strip()
+    if not raw:
+        return None
+    repo, sep, layer = raw.partition(":")
+    if not sep:
+        return None, raw
+    repo = repo.strip()
+    layer = layer.strip()
+    if not repo or not layer:
+        raise ValueError("include_layer entries must be 'repo:layer' or 'layer'")
+    return repo, layer
+
+
 class KASExporter:
     def __init__(
             self,
@@ -128,7 +264,9 @@ class KASExporter:
             include_layers: Optional[Iterable[str]] = None,
             include_all_layers: bool = False,
     ):
-        self.manifest_data = copy.deepcopy(manifest_data)
+        # Held by reference: the exporter only reads manifest_data and builds fresh containers for
+        # its output, so the caller's dict is shared (mutating it afterwards is visible).
+        self.manifest_data = manifest_data
         self.version = _coerce_version(version)
         self.path_prefix = (path_prefix or "").strip().strip("/\\") or None
         if path_dedup not in {"off", "suffix"}:
@@ -141,47 +279,90 @@ class KASExporter:
 
         include_layers = include_layers or []
         self._requested_layer_tokens: set[str] = set()
-        self._include_layers_by_repo: dict[tuple[str, str], str] = {}
-        self._include_layers_any_repo: dict[str, str] = {}
+        # Bare "layer" requests (the token is the layer name) and repo -> {layer: "repo:layer"}
+        self._include_any_layers: set[str] = set()
+        self._include_layers_for_repo: dict[str, dict[str, str]] = {}
         for entry in include_layers:
-            raw = str(entry).strip()
-            if not raw:
+            parsed = _parse_include_layer(entry)
+            if parsed is None:
                 continue
-            if ":" in raw:
-                repo, layer = raw.split(":", 1)
-                repo = repo.strip()
-                layer = layer.strip()
-                if not repo or not layer:
-                    raise ValueError(
-                        "include_layer entries must be 'repo:layer' or 'layer'"
-                    )
+            repo, layer = parsed
+            if repo is not None:
                 token = f"{repo}:{layer}"
                 self._requested_layer_tokens.add(token)
-                self._include_layers_by_repo[(repo, layer)] = token
+                self._include_layers_for_repo.setdefault(repo, {})[layer] = token
             else:
-                token = raw
-                self._requested_layer_tokens.add(token)
-                self._include_layers_any_repo[token] = token
+                self._requested_layer_tokens.add(layer)
+                self._include_any_layers.add(layer)
 
         self._detected_layers_by_repo: dict[str, list[str]] = {}
         self._matched_layer_tokens: set[str] = set()
         self._layer_detection_failures: dict[str, str] = {}
-
-        # Build remote->fetch map for URL resolution
-        self._remote_fetch = {
-            r["name"]: r.get("fetch", "") for r in self.manifest_data.get("remote", [])
-        }
+        # (url, revision) -> discovery Future, kept across exports; see invalidate_layer_cache()
+        self._discovered_layers: dict[tuple, Future] = {}
+        # desired path -> next "~N" suffix to try; lets repeated collisions skip taken suffixes.
+        self._path_suffix_counter: dict[str, int] = {}
+
+        # Build remote->fetch map for URL resolution; non-empty fetch URLs carry their trailing '/'
+        # already, so resolving a project URL is one lookup and one concatenation
+        self._remote_fetch = {}
+        for r in self.manifest_data.get("remote", []):
+            fetch = r.get("fetch", "")
+            self._remote_fetch[r["name"]] = fetch if not fetch or fetch.endswith("/") else fetch + "/"
 
     # ----------------------------- public API -----------------------------
 
     def generate_kas_configuration(self) -> str:
+        buf = io.StringIO()
+        self.generate_kas_configuration_to(buf)
+        return buf.getvalue()
+
+    def generate_kas_configuration_json(self) -> str:
+        """
+        The same configuration as JSON, which kas reads as well and which serializes far faster
+        than YAML. JSON has no comments, so the source header comment is not emitted.
+        """
+        data = self._build_configuration()
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def invalidate_layer_cache(self) -> None:
+        """
+        Forget the layers discovered by earlier exports so the next export scans again.
+        Call this after changing manifest_data; the process-wide per-(url, revision) cache
+        still applies to successful scans, so unchanged repos are not rescanned remotely.
+        Cached failures are dropped, so repos that failed before are retried.
+        """
+        self._discovered_layers = {}
+        _forget_layer_failures()
+
+    def generate_kas_configuration_to(self, stream: TextIO) -> None:
+        """Write the kas YAML (with its source comment header) to a text stream."""
+        data = self._build_configuration()
+
+        # Prepend source comment header
+        header_comment = self._render_source_comment(self.manifest_data.get("__source"))
+        if header_comment:
+            stream.write(header_comment + "\n")
+
+        # Emit straight into the stream rather than materializing the document as a str first
+        yaml.dump(data, stream, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
+
+    # --------------------------- internal helpers -------------------------
+
+    def _build_configuration(self) -> Dict[str, Any]:
+        """Assemble the kas configuration mapping, in output key order."""
         self._reset_layer_tracking()
 
+        m_get = self.manifest_data.get
+        v = self.version
+
         # Build the kas configuration header
         data = self._build_header()
 
         # Build system
-        build_system = self._build_system(self.manifest_data.get("build_system"))
+        build_system = self._build_system(m_get("build_system"))
         if build_system:
             data["build_system"] = build_system
 
@@ -191,68 +372,46 @@ class KASExporter:
             data["defaults"] = defaults
 
         # Machine
-        if self.manifest_data.get("machine"):
-            data["machine"] = self.manifest_data["machine"]
+        machine = m_get("machine")
+        if machine:
+            data["machine"] = machine
 
         # Distro
-        if self.manifest_data.get("distro"):
-            data["distro"] = self.manifest_data["distro"]
+        distro = m_get("distro")
+        if distro:
+            data["distro"] = distro
 
         # v4+: target can be list
-        targets = self.manifest_data.get("targets")
+        targets = m_get("targets")
         if targets:
             data["target"] = list(targets) if isinstance(targets, (list, tuple)) else [str(targets)]
 
         # v3+: task
-        if self.version >= 3 and self.manifest_data.get("task"):
-            data["task"] = str(self.manifest_data["task"])
+        task = m_get("task")
+        if v >= 3 and task:
+            data["task"] = str(task)
 
         # v6+: env
-        if self.version >= 6:
-            env = self.manifest_data.get("env")
+        if v >= 6:
+            env = m_get("env")
             if isinstance(env, dict) and env:
-                if self.version < 13:
-                    env = {k: ("" if v is None else v) for k, v in env.items()}
+                # Pre-v13 has no null env values; only rebuild the dict when one is present
+                if v < 13 and any(val is None for val in env.values()):
+                    env = {k: ("" if val is None else val) for k, val in env.items()}
                 data["env"] = env
 
-        # v10+: build_system
-        if self.version >= 10 and self.manifest_data.get("build_system"):
-            data["build_system"] = self.manifest_data["build_system"]
-
-        # headers (always accepted)
-        if self.manifest_data.get("bblayers_conf_header"):
-            data["bblayers_conf_header"] = self.manifest_data["bblayers_conf_header"]
-        if self.manifest_data.get("local_conf_header"):
-            data["local_conf_header"] = self.manifest_data["local_conf_header"]
-        if self.manifest_data.get("menu_configuration"):
-            data["menu_configuration"] = self.manifest_data["menu_configuration"]
-
-        # v17+: artifacts
-        if self.version >= 17 and self.manifest_data.get("artifacts"):
-            data["artifacts"] = self.manifest_data["artifacts"]
-
-        # v19+: signers
-        if self.version >= 19 and self.manifest_data.get("signers"):
-            data["signers"] = self.manifest_data["signers"]
-
-        # defaults / repos
-
+        # Copied through as-is once the format version allows them (see _PASSTHROUGH_KEYS)
+        for key, min_version in _PASSTHROUGH_KEYS:
+            value = m_get(key)
+            if value and v >= min_version:
+                data[key] = value
 
         repos = self._build_repos()
         if repos:
             data["repos"] = repos
 
         self._validate_layer_requests()
-
-        yaml_text = yaml.dump(data, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
-
-        # Prepend source comment header
-        header_comment = self._render_source_comment(self.manifest_data.get("__source"))
-        if header_comment:
-            return header_comment + "\n" + yaml_text
-        return yaml_text
-
-    # --------------------------- internal helpers -------------------------
+        return data
 
     def _build_header(self) -> Dict[str, Any]:
         """
@@ -317,46 +476,39 @@ class KASExporter:
     def _build_system(value: Optional[str], *, strict: bool = False) -> str | None:
         if not value:
             return None
-        v = value.strip().lower()
-        if v not in _BUILD_SYSTEMS:
-            if strict:
-                raise ValueError(f"build_system must be one of {_BUILD_SYSTEMS}, got {value!r}")
-            return None
-        return "openembedded" if v in {"oe", "openembedded"} else "isar"
+        result = _BUILD_SYSTEM_MAP.get(value.strip().lower())
+        if result is None and strict:
+            raise ValueError(f"build_system must be one of {sorted(_BUILD_SYSTEM_MAP)}, got {value!r}")
+        return result
 
     def _render_source_comment(self, src: Optional[Dict[str, Any]]) -> str:
-        lines = ["# -----------------------------------------------------------------------------",
-                 "# KAS Exporter Generated Configuration", f"#   kas format: v{self.version}"]
+        head = f"{_COMMENT_RULE}\n# KAS Exporter Generated Configuration\n#   kas format: v{self.version}\n"
         if not src:
-            lines.append("#   source: (unspecified)")
+            body = "#   source: (unspecified)\n"
         else:
             st = src.get("type")
             if st == "git":
-                repo = src.get("repo_url", "(unknown)")
-                branch = src.get("branch") or "(default branch)"
-                mfile = src.get("manifest_filename") or "default.xml"
                 when = src.get("pulled_at") or src.get("timestamp") or "(unknown time)"
-                commit = src.get("commit") or "(HEAD unknown)"
-                transport = src.get("transport") or "git"
-                lines.append(f"#   source: git repo ({transport})")
-                lines.append(f"#     repo:   {repo}")
-                lines.append(f"#     branch: {branch}")
-                lines.append(f"#     file:   {mfile}")
-                lines.append(f"#     head:   {commit}")
-                lines.append(f"#     pulled: {when} (UTC)")
+                body = (
+                    f"#   source: git repo ({src.get('transport') or 'git'})\n"
+                    f"#     repo:   {src.get('repo_url', '(unknown)')}\n"
+                    f"#     branch: {src.get('branch') or '(default branch)'}\n"
+                    f"#     file:   {src.get('manifest_filename') or 'default.xml'}\n"
+                    f"#     head:   {src.get('commit') or '(HEAD unknown)'}\n"
+                    f"#     pulled: {when} (UTC)\n"
+                )
             elif st == "file":
-                fn = src.get("filename") or "(unknown file)"
                 when = src.get("parsed_at") or src.get("timestamp") or "(unknown time)"
-                lines.append(f"#   source: local file")
-                lines.append(f"#     file:   {fn}")
-                lines.append(f"#     parsed: {when} (UTC)")
+                body = (
+                    "#   source: local file\n"
+                    f"#     file:   {src.get('filename') or '(unknown file)'}\n"
+                    f"#     parsed: {when} (UTC)\n"
+                )
             else:
-                lines.append(f"#   source: {st or '(unknown)'}")
+                body = f"#   source: {st or '(unknown)'}\n"
         if self.path_prefix:
-            lines.append(f"#   path_prefix: {self.path_prefix}")
-            lines.append(f"#   path_dedup:  {self.path_dedup}")
-        lines.append("# -----------------------------------------------------------------------------")
-        return "\n".join(lines)
+            body += f"#   path_prefix: {self.path_prefix}\n#   path_dedup:  {self.path_dedup}\n"
+        return head + body + _COMMENT_RULE
 
 
 
@@ -385,16 +537,12 @@ class KASExporter:
         tag = d.get("tag")
 
         if rev:
-            if rev.startswith("refs/tags/"):
-                tag = tag or rev.split("/", 2)[-1]
-            elif rev.startswith("refs/heads/") or rev.startswith("origin/"):
-                branch = branch or rev.split("/", 2)[-1]
-            else:
+            kind, value = _classify_revision(rev)
+            if kind == "tag":
+                tag = tag or value
+            elif kind in ("branch", "other"):
                 # Treat non-SHA rev as a branch name
-                _hex = "0123456789abcdef"
-                is_sha = len(rev) in (40, 64) and all(c in _hex for c in rev.lower())
-                if not is_sha:
-                    branch = branch or rev
+                branch = branch or value
 
         # Build 'defaults.repos' per spec
         repos_defaults: Dict[str, Any] = {}
@@ -419,51 +567,56 @@ class KASExporter:
         return defs
 
     def _build_repos(self) -> Dict[str, Any]:
-        repos: Dict[str, Any] = {}
+        # Pass 1 (sequential): URL, path de-dup and revision fields; path de-dup is order-dependent.
+        prepared: list[tuple[str, Dict[str, Any], Dict[str, Any], str | None]] = []
         used_paths: set[str] = set()
+        self._path_suffix_counter = {}
+
+        # Loop invariants, bound once rather than looked up per project
+        v = self.version
+        prefix = self.path_prefix.strip().rstrip('/\\') if self.path_prefix else None
+        prefix_always = self.path_apply_mode == "always"
+        repo_id_of = self._repo_id
+        resolve_url = self._resolve_url
+        dedup = self._dedup_or_fail
+        derive = self._derive_revision_fields
 
         for proj in self.manifest_data.get("project", []):
-            repo_id = self._repo_id(proj)
+            proj_get = proj.get
+            repo_id = repo_id_of(proj)
             repo_entry: Dict[str, Any] = {}
 
             # URL
-            url = self._resolve_url(proj)
-            if "url" in proj or url:
-                repo_entry["url"] = proj.get("url", url)
+            url = resolve_url(proj)
+            if url is not None or "url" in proj:
+                repo_entry["url"] = proj_get("url", url)
 
             print(f"Scanning repo {repo_id}...")
 
-            # PATH handling
-            explicit_path = proj.get("path")
-            if self.path_prefix:
-                prefix = self.path_prefix.strip().rstrip('/\\')
-                if self.path_apply_mode == "always" or not explicit_path:
-                    desired_path = f"{prefix}/{repo_id}"
-                else:
-                    # missing-only and an explicit path exists -> keep the explicit one
-                    desired_path = explicit_path
-            else:
-                desired_path = None  # do not emit a path at all when no prefix
-
-            if desired_path:
-                final_path = self._dedup_or_fail(desired_path, used_paths, repo_id)
-                repo_entry["path"] = final_path
+            # PATH handling; without a prefix no path is emitted at all, and in missing-only
+            # mode an explicit path is kept as-is
+            if prefix:
+                explicit_path = proj_get("path")
+                desired_path = f"{prefix}/{repo_id}" if prefix_always or not explicit_path else explicit_path
+                repo_entry["path"] = dedup(desired_path, used_paths, repo_id)
 
             # v7: type
-            if self.version >= 7 and proj.get("type"):
-                repo_entry["type"] = proj["type"]
+            if v >= 7:
+                proj_type = proj_get("type")
+                if proj_type:
+                    repo_entry["type"] = proj_type
 
             # revisions (v14+ commit/branch/tag; earlier refspec)
-            commit, branch, tag, refspec = self._derive_revision_fields(proj)
+            commit, branch, tag, refspec = derive(proj)
             revision = None
-            if self.version >= 14:
+            if v >= 14:
                 if commit is not None:
                     repo_entry["commit"] = commit
                     revision = commit
-                if branch is not None or (self.version >= 18 and "branch" in proj):
+                if branch is not None or (v >= 18 and "branch" in proj):
                     repo_entry["branch"] = branch
                     revision = branch
-                if self.version >= 15 and (tag is not None or (self.version >= 18 and "tag" in proj)):
+                if v >= 15 and (tag is not None or (v >= 18 and "tag" in proj)):
                     repo_entry["tag"] = tag
                     revision = tag
             else:
@@ -471,10 +624,29 @@ class KASExporter:
                     repo_entry["refspec"] = refspec
                     revision = refspec
 
-            # layers
+            prepared.append((repo_id, proj, repo_entry, revision))
+
+        # Pass 2 (parallel): layer discovery is network-bound and independent per (url, revision).
+        # Successful results stay on the exporter, so repeated exports only redo the cheap
+        # selection below; failures are dropped after this export (pass 3) and looked up again.
+        discovered = self._discovered_layers
+        missing = [
+            key for key in ((entry.get("url"), revision) for _, _, entry, revision in prepared)
+            if key not in discovered
+        ]
+        if missing:
             print("  Discovering layers...")
+            discovered.update(self._discover_layers_parallel(missing))
+
+        # Pass 3 (sequential): assemble entries in manifest order so output and errors are deterministic
+        repos: Dict[str, Any] = {}
+        filter_layers = self._filter_layer_list
+        normalize_layers = self._normalize_layers
+        for repo_id, proj, repo_entry, revision in prepared:
+            proj_get = proj.get
+            # layers
             try:
-                layers = _discover_layers(repo_entry["url"], revision)
+                layers = discovered[(repo_entry.get("url"), revision)].result()
             except Exception as exc:  # noqa: BLE001 - log repo context, continue
                 print(
                     f"  Layer detection failed for {repo_id}: {exc}",
@@ -482,38 +654,66 @@ class KASExporter:
                 )
                 self._layer_detection_failures[repo_id] = str(exc)
                 layers = None
-            filtered_layers = self._filter_layer_list(layers or [])
+            filtered_layers = filter_layers(layers or [])
             if filtered_layers:
                 self._detected_layers_by_repo[repo_id] = filtered_layers
                 selected_layers = self._select_layers_for_repo(repo_id, filtered_layers)
                 if selected_layers:
-                    repo_entry["layers"] = self._normalize_layers(selected_layers)
+                    repo_entry["layers"] = normalize_layers(selected_layers, already_filtered=True)
             elif self._layer_detection_failures.get(repo_id):
                 manual_layers = self._fallback_manual_layers(repo_id)
                 if manual_layers:
-                    repo_entry["layers"] = self._normalize_layers(manual_layers)
+                    repo_entry["layers"] = normalize_layers(manual_layers)
 
             # v8: patches
-            if self.version >= 8 and proj.get("patches"):
-                repo_entry["patches"] = self._normalize_patches(proj["patches"])
+            if v >= 8:
+                patches = proj_get("patches")
+                if patches:
+                    repo_entry["patches"] = self._normalize_patches(patches)
 
             # v19: signing
-            if self.version >= 19:
-                if proj.get("signed") is not None:
-                    repo_entry["signed"] = bool(proj["signed"])
-                if proj.get("allowed_signers"):
-                    repo_entry["allowed_signers"] = list(proj["allowed_signers"])
+            if v >= 19:
+                signed = proj_get("signed")
+                if signed is not None:
+                    repo_entry["signed"] = bool(signed)
+                allowed_signers = proj_get("allowed_signers")
+                if allowed_signers:
+                    repo_entry["allowed_signers"] = list(allowed_signers)
 
             # (No 'remote' key in repos)
 
             # Optional: keep explicit human name if it differs
-            if proj.get("name") and proj["name"] != repo_id:
-                repo_entry["name"] = proj["name"]
+            name = proj_get("name")
+            if name and name != repo_id:
+                repo_entry["name"] = name
 
             repos[repo_id] = repo_entry
 
+        # Forget failed lookups: transient errors get retried, deterministic ones come back from
+        # _LAYER_CACHE without touching the network
+        for key in [key for key, future in discovered.items() if future.exception() is not None]:
+            del discovered[key]
+
         return repos
 
+    @staticmethod
+    def _discover_layers_parallel(keys: Iterable[tuple[str | None, str | None]]) -> dict[tuple, Future]:
+        """Submit one discovery per distinct (url, revision); returns key -> Future."""
+        unique = list(dict.fromkeys(keys))
+        futures: dict[tuple, Future] = {}
+        if not unique:
+            return futures
+
+        def discover(url: str | None, revision: str | None) -> list[str] | None:
+            if url is None:
+                raise KeyError("url")
+            return _discover_layers(url, revision)
+
+        with ThreadPoolExecutor(max_workers=min(_MAX_DISCOVERY_WORKERS, len(unique))) as executor:
+            for url, revision in unique:
+                futures[(url, revision)] = executor.submit(discover, url, revision)
+        return futures
+
     def _reset_layer_tracking(self) -> None:
         self._detected_layers_by_repo = {}
         self._matched_layer_tokens = set()
@@ -530,29 +730,15 @@ class KASExporter:
         if not self._requested_layer_tokens:
             return []
 
-        selected: list[str] = []
-        for layer in available_layers:
-            matched = False
-            repo_key = (repo_id, layer)
-            token = self._include_layers_by_repo.get(repo_key)
-            if token:
-                self._matched_layer_tokens.add(token)
-                matched = True
-            token = self._include_layers_any_repo.get(layer)
-            if token:
-                self._matched_layer_tokens.add(token)
-                matched = True
-            if matched:
-                selected.append(layer)
-        return selected
+        hits = self._match_layer_requests(repo_id, available_layers)
+        if not hits:
+            return []
+        return [layer for layer in available_layers if layer in hits]
 
     def _fallback_manual_layers(self, repo_id: str) -> list[str]:
-        manual: list[str] = []
-        for (repo, layer), token in self._include_layers_by_repo.items():
-            if repo != repo_id:
-                continue
-            manual.append(layer)
-            self._matched_layer_tokens.add(token)
+        by_layer = self._include_layers_for_repo.get(repo_id, {})
+        manual = list(by_layer)
+        self._matched_layer_tokens.update(by_layer.values())
         if manual:
             warnings.warn(
                 (
@@ -564,24 +750,35 @@ class KASExporter:
         return manual
 
     def _mark_matching_layer_requests(self, repo_id: str, available_layers: list[str]) -> None:
-        if not self._requested_layer_tokens:
+        # Nothing requested, or every request already satisfied by an earlier repo
+        if len(self._matched_layer_tokens) >= len(self._requested_layer_tokens):
             return
-        for layer in available_layers:
-            repo_key = (repo_id, layer)
-            token = self._include_layers_by_repo.get(repo_key)
-            if token:
-                self._matched_layer_tokens.add(token)
-            token = self._include_layers_any_repo.get(layer)
-            if token:
-                self._matched_layer_tokens.add(token)
+        self._match_layer_requests(repo_id, available_layers)
+
+    def _match_layer_requests(self, repo_id: str, available_layers: list[str]) -> set[str]:
+        """Mark requests satisfied by available_layers; returns the requested layer names found."""
+        hits = self._include_any_layers.intersection(available_layers)
+        self._matched_layer_tokens.update(hits)
+        by_layer = self._include_layers_for_repo.get(repo_id)
+        if by_layer:
+            repo_hits = by_layer.keys() & set(available_layers)
+            self._matched_layer_tokens.update(by_layer[layer] for layer in repo_hits)
+            hits |= repo_hits
+        return hits
 
     def _validate_layer_requests(self) -> None:
         if not self._requested_layer_tokens:
             return
-        missing = sorted(self._requested_layer_tokens - self._matched_layer_tokens)
+        missing = self._requested_layer_tokens - self._matched_layer_tokens
         if not missing:
             return
+        raise ValueError(
+            "Requested layers were not found: " + ", ".join(sorted(missing)) +
+            "\nAvailable layers:\n" + self._format_available_layers()
+        )
 
+    def _format_available_layers(self) -> str:
+        """Per-repo listing of detected layers (or detection failures) for error messages."""
         available_lines: list[str] = []
         repo_ids = set(self._detected_layers_by_repo)
         repo_ids.update(self._layer_detection_failures)
@@ -594,11 +791,7 @@ class KASExporter:
                 else:
                     layers = ", ".join(self._detected_layers_by_repo[repo_id]) or "(none)"
                 available_lines.append(f"  {repo_id}: {layers}")
-        available_msg = "\n".join(available_lines)
-        raise ValueError(
-            "Requested layers were not found: " + ", ".join(missing) +
-            "\nAvailable layers:\n" + available_msg
-        )
+        return "\n".join(available_lines)
 
     # ------------- path de-dup / conflict handling -------------
 
@@ -618,18 +811,18 @@ class KASExporter:
             warnings.warn(msg + " (path_dedup='off' -> raising)", UserWarning)
             raise ValueError(msg + " Enable path_dedup='suffix' to auto-resolve.")
         else:
-            # Apply suffixing
-            n = 1
-            while True:
-                candidate = f"{desired_path}~{n}"
-                if candidate not in used_paths:
-                    warnings.warn(
-                        msg + f" Using de-duplicated path: '{candidate}'.",
-                        UserWarning,
-                    )
-                    used_paths.add(candidate)
-                    return candidate
+            # Apply suffixing, resuming after the last suffix handed out for this path
+            n = self._path_suffix_counter.get(desired_path, 1)
+            while f"{desired_path}~{n}" in used_paths:
                 n += 1
+            self._path_suffix_counter[desired_path] = n + 1
+            candidate = f"{desired_path}~{n}"
+            warnings.warn(
+                msg + f" Using de-duplicated path: '{candidate}'.",
+                UserWarning,
+            )
+            used_paths.add(candidate)
+            return candidate
 
     # ------------------------------ utilities -----------------------------
 
@@ -644,15 +837,15 @@ class KASExporter:
         return "repo"
 
     def _resolve_url(self, proj: Dict[str, Any]):
-        if proj.get("url") is not None:
-            return proj.get("url")
+        url = proj.get("url")
+        if url is not None:
+            return url
         remote = proj.get("remote")
         name = proj.get("name")
-        if remote and name and remote in self._remote_fetch:
-            fetch = self._remote_fetch[remote]
-            if fetch and not fetch.endswith("/"):
-                fetch += "/"
-            return f"{fetch}{name}"
+        if remote and name:
+            fetch = self._remote_fetch.get(remote)
+            if fetch is not None:
+                return fetch + name
         return None
 
     def _derive_revision_fields(self, proj: Dict[str, Any]):
@@ -663,17 +856,18 @@ class KASExporter:
         refspec = proj.get("refspec")
 
         if rev:
-            if rev.startswith("refs/tags/"):
-                tag = tag or rev.split("/", 2)[-1]
-            elif rev.startswith("refs/heads/") or rev.startswith("origin/"):
-                branch = branch or rev.split("/", 2)[-1]
-            elif len(rev) in (40, 64) and all(c in "0123456789abcdef" for c in rev.lower()):
-                commit = commit or rev
+            kind, value = _classify_revision(rev)
+            if kind == "tag":
+                tag = tag or value
+            elif kind == "branch":
+                branch = branch or value
+            elif kind == "commit":
+                commit = commit or value
             else:
                 if self.version < 14:
-                    refspec = refspec or rev
+                    refspec = refspec or value
                 else:
-                    branch = branch or rev
+                    branch = branch or value
         return commit, branch, tag, refspec
 
     @staticmethod
@@ -682,7 +876,7 @@ class KASExporter:
         for layer in layers:
             if not layer:
                 continue
-            if any(s in layer for s in _LAYER_FILTER_SUBSTRS):
+            if _LAYER_FILTER_RE.search(layer):
                 continue
             if layer in seen:
                 continue
@@ -692,9 +886,10 @@ class KASExporter:
         return out
 
     @classmethod
-    def _normalize_layers(cls, layers: Iterable[str]) -> Dict[str, Any]:
-        filtered = cls._filter_layer_list(layers)
-        return {name: None for name in filtered}
+    def _normalize_layers(cls, layers: Iterable[str], *, already_filtered: bool = False) -> Dict[str, Any]:
+        # already_filtered: 'layers' is (an ordered subset of) _filter_layer_list output
+        filtered = layers if already_filtered else cls._filter_layer_list(layers)
+        return dict.fromkeys(filtered)
 
     @staticmethod
     def _normalize_patches(patches: Any) -> Dict[str, Any]:
@@ -1,14 +1,20 @@
+import functools
+import hashlib
+import json
 import os
+import posixpath
 import shutil
+import sys
 import tempfile
+import threading
 import warnings
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Iterable, Tuple
 
 import pygit2 as git
 from pygit2.enums import ResetMode, CheckoutStrategy
 from pygit2 import Repository, Commit
-from _repo_manifest_parser import RepoManifestParser
+from _repo_manifest_parser import RepoManifestParser, _utc_now_iso
 
 
 class LibGitError(RuntimeError):
@@ -22,6 +28,10 @@ _DEFAULT_MANIFESTS: List[str] = [
 ]
 
 
+# Default history depth for manifest clones; only the tip commit is ever read. 0 clones in full.
+_CLONE_DEPTH = 1
+
+
 def _repo_key_from_path_or_name(path_or_name: str) -> str:
     """Return a stable repo key (kas 'repos:' key) from manifest project path/name."""
     base = os.path.basename(path_or_name.rstrip("/"))
@@ -66,6 +76,27 @@ def _discover_default_branch(repo: Repository) -> Optional[str]:
     return None
 
 
+def _remote_heads(origin: Any) -> Dict[str, str]:
+    """Ref name -> hex oid as advertised by the remote: one round trip, no objects transferred."""
+    # list_heads() replaced ls_remotes() (dicts) in pygit2 1.15
+    heads = origin.list_heads() if hasattr(origin, "list_heads") else origin.ls_remotes()
+    advertised: Dict[str, str] = {}
+    for head in heads:
+        name, oid = (head["name"], head["oid"]) if isinstance(head, dict) else (head.name, head.oid)
+        advertised.setdefault(name, str(oid))
+    return advertised
+
+
+def _tracking_ref_current(repo: Repository, origin: Any, branch_name: str) -> bool:
+    """True when origin/<branch_name> already points at the tip the remote advertises."""
+    try:
+        local_tip = repo.lookup_reference(f"refs/remotes/origin/{branch_name}").target
+        heads = _remote_heads(origin)
+    except Exception:  # noqa - unknown ref or listing failed; just fetch
+        return False
+    return heads.get(f"refs/heads/{branch_name}") == str(local_tip)
+
+
 def _checkout_branch(repo: Repository, branch_name: str) -> None:
     """
     Ensure a local branch exists for 'branch_name' from origin/<branch_name>,
@@ -75,7 +106,8 @@ def _checkout_branch(repo: Repository, branch_name: str) -> None:
         origin = repo.remotes["origin"]
     except KeyError:
         raise LibGitError("Remote 'origin' not found in repository")
-    origin.fetch([f"refs/heads/{branch_name}:refs/remotes/origin/{branch_name}"])
+    if not _tracking_ref_current(repo, origin, branch_name):
+        origin.fetch([f"refs/heads/{branch_name}:refs/remotes/origin/{branch_name}"])
 
     local_ref_name = f"refs/heads/{branch_name}"
 
@@ -86,38 +118,199 @@ def _checkout_branch(repo: Repository, branch_name: str) -> None:
             remote_ref = repo.lookup_reference(f"refs/remotes/origin/{branch_name}")
         except KeyError:
             raise LibGitError(f"Cannot find remote branch 'origin/{branch_name}' after fetch")
-        commit: Optional[Commit] = repo.get(remote_ref.target)
-        if commit:
+        commit = repo.get(remote_ref.target)
+        if isinstance(commit, Commit):
             repo.create_branch(branch_name, commit)
 
+    try:
+        prev_head = None if repo.head_is_unborn else repo.head.target
+    except Exception:  # noqa
+        prev_head = None
+
     repo.set_head(local_ref_name)
 
     target = repo.revparse_single(local_ref_name)
+    if prev_head == target.id and not repo.status():
+        # Fresh clones usually already sit on this commit with a clean tree
+        return
     repo.reset(target.id, ResetMode.HARD)
 
     repo.checkout_head(strategy=CheckoutStrategy.SAFE)
 
 
-def _resolve_manifest_path(repo_root: str, manifest_filename: Optional[str]) -> str:
+def _clone_shallow(
+        repo_url: str, clone_dir: str, branch: Optional[str], *, bare: bool = False,
+        depth: int = _CLONE_DEPTH,
+) -> tuple[Repository, bool]:
     """
-    Try the provided filename; if not given or not found, try common defaults.
-    Returns absolute path to a found manifest; raises FileNotFoundError otherwise.
+    Clone with 'depth' commits of history (0: all), checking out 'branch' directly when given.
+    Returns (repo, on_branch); on_branch is False when pygit2 predates shallow clones and a
+    full clone of the default branch was made instead (the caller then checks out 'branch').
     """
+    if depth <= 0:
+        return git.clone_repository(repo_url, clone_dir, bare=bare, checkout_branch=branch), True
+    try:
+        repo = git.clone_repository(
+            repo_url, clone_dir, bare=bare, depth=depth, checkout_branch=branch
+        )
+        return repo, True
+    except TypeError:  # pygit2 < 1.14: no 'depth' keyword
+        return git.clone_repository(repo_url, clone_dir, bare=bare), False
+    except git.GitError as e:
+        # libgit2's local transport (paths, file:// URLs) cannot fetch shallowly
+        if "shallow" not in str(e):
+            raise
+        shutil.rmtree(clone_dir, ignore_errors=True)
+        return git.clone_repository(repo_url, clone_dir, bare=bare, checkout_branch=branch), True
+
+
+def _resolve_tip(repo: Repository, branch: Optional[str]) -> tuple[Commit, Optional[str]]:
+    """Commit to read in a bare repo: the tip of 'branch', else HEAD. Returns (commit, branch name)."""
+    if branch:
+        # Full (non-shallow) bare clones only hold the default branch under refs/heads
+        for ref_name in (f"refs/heads/{branch}", f"refs/remotes/origin/{branch}"):
+            try:
+                return repo.lookup_reference(ref_name).peel(Commit), branch
+            except KeyError:
+                continue
+        raise LibGitError(f"Cannot find branch '{branch}' in the cloned repository")
+    return repo.head.peel(Commit), _discover_default_branch(repo)
+
+
+def _tree_reader(repo: Repository, tree: Any) -> Callable[[str], Optional[bytes]]:
+    """File reader over a git tree for RepoManifestParser; paths are relative to the repo root."""
+    def read(path: str) -> Optional[bytes]:
+        rel = posixpath.normpath(path.replace(os.sep, "/")).lstrip("/")
+        try:
+            obj = repo[tree[rel].id]
+        except (KeyError, ValueError):
+            return None
+        return obj.data if isinstance(obj, git.Blob) else None
+
+    return read
+
+
+def _manifest_candidates(manifest_filename: Optional[str]) -> List[str]:
     candidates: List[str] = []
     if manifest_filename:
         candidates.append(manifest_filename)
     for c in _DEFAULT_MANIFESTS:
         if c not in candidates:
             candidates.append(c)
+    return candidates
+
 
+def _load_from_odb(
+        repo: Repository, branch: Optional[str], manifest_filename: Optional[str]
+) -> tuple[Dict[str, Any], Optional[str], str, str]:
+    """
+    Parse the manifest (and its includes) straight from the object database, without a
+    working tree. Returns (manifest_data, active_branch, head_commit, manifest_relpath).
+    """
+    commit, active_branch = _resolve_tip(repo, branch)
+    read = _tree_reader(repo, commit.tree)
+    candidates = _manifest_candidates(manifest_filename)
     for cand in candidates:
-        p = os.path.normpath(os.path.join(repo_root, cand))
+        rel = posixpath.normpath(cand.replace(os.sep, "/"))
+        data = read(rel)
+        if data is not None:
+            # A rooted virtual dir, so includes resolve relative to the manifest inside the tree
+            manifest_dir = "/" + posixpath.dirname(rel)
+            manifest_data = RepoManifestParser(read_file=read).parse_bytes(data, manifest_dir=manifest_dir)
+            return manifest_data, active_branch, str(commit.id), rel
+    raise FileNotFoundError(
+        f"Manifest not found. Tried: {', '.join(candidates)} in commit {commit.id}"
+    )
+
+
+def _mirror_path(repo_url: str, cache_dir: str) -> str:
+    return os.path.join(
+        os.path.expanduser(cache_dir), hashlib.sha1(repo_url.encode("utf-8")).hexdigest() + ".git"
+    )
+
+
+def _update_mirror(repo_url: str, cache_dir: str) -> str:
+    """
+    Create or refresh the bare mirror of 'repo_url' under 'cache_dir'; returns its path.
+    The first call clones in full, later calls fetch only what changed upstream.
+    """
+    path = _mirror_path(repo_url, cache_dir)
+    if os.path.isdir(path):
+        repo = git.Repository(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Bare clone sets HEAD to the provider's default branch
+        repo = git.clone_repository(repo_url, path, bare=True)
+    # Mirror every branch as a local head, so clones from the mirror can check any of them out
+    repo.remotes["origin"].fetch(["+refs/heads/*:refs/heads/*"])
+    return path
+
+
+def _manifest_cache_file(cache_dir: str, repo_url: str, branch: Optional[str],
+                         manifest_filename: Optional[str], commit: str) -> str:
+    key = json.dumps([repo_url, branch, manifest_filename, commit])
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(os.path.expanduser(cache_dir), "manifests", digest + ".json")
+
+
+def _cached_manifest(repo_url: str, branch: Optional[str], manifest_filename: Optional[str],
+                     cache_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    The manifest_data stored for the commit the remote currently advertises for 'branch' (HEAD
+    when None), or None. Costs one ls-remote round trip; needs the mirror from an earlier load.
+    """
+    mirror = _mirror_path(repo_url, cache_dir)
+    if not os.path.isdir(mirror):
+        return None
+    try:
+        heads = _remote_heads(git.Repository(mirror).remotes["origin"])
+    except Exception:  # noqa - cannot list the remote; take the regular (fetching) path
+        return None
+    tip = heads.get(f"refs/heads/{branch}" if branch else "HEAD")
+    if tip is None:
+        return None
+    try:
+        with open(_manifest_cache_file(cache_dir, repo_url, branch, manifest_filename, tip), "rb") as fh:
+            manifest_data = json.loads(fh.read())
+    except (OSError, ValueError):
+        return None
+    manifest_data["__source"]["pulled_at"] = _utc_now_iso()
+    return manifest_data
+
+
+def _store_manifest(manifest_data: Dict[str, Any], repo_url: str, branch: Optional[str],
+                    manifest_filename: Optional[str], cache_dir: str) -> None:
+    path = _manifest_cache_file(cache_dir, repo_url, branch, manifest_filename,
+                                manifest_data["__source"]["commit"])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(manifest_data, fh)
+        os.replace(tmp, path)  # concurrent loaders never read a partial file
+    except (OSError, TypeError, ValueError):
+        pass  # caching is best effort
+
+
+def _resolve_manifest_path(repo_root: str, manifest_filename: Optional[str]) -> str:
+    """
+    Try the provided filename; if not given or not found, try common defaults.
+    Returns absolute path to a found manifest; raises FileNotFoundError otherwise.
+    """
+    # The named file is the common case: one stat, and no join for an absolute path
+    if manifest_filename:
+        p = manifest_filename if os.path.isabs(manifest_filename) else os.path.join(repo_root, manifest_filename)
+        p = os.path.normpath(p)
         if os.path.isfile(p):
             return p
 
-    # If they passed an absolute path, try that as-is
-    if manifest_filename and os.path.isabs(manifest_filename) and os.path.isfile(manifest_filename):
-        return manifest_filename
+    candidates = _manifest_candidates(manifest_filename)
+    for cand in candidates:
+        if cand == manifest_filename:
+            continue  # already tried above
+        p = os.path.normpath(os.path.join(repo_root, cand))
+        if os.path.isfile(p):
+            return p
 
     raise FileNotFoundError(
         f"Manifest not found. Tried: {', '.join(candidates)} inside {repo_root}"
@@ -131,6 +324,8 @@ def load_manifest_from_git(
         *,
         workdir: Optional[str] = None,
         keep_checkout: bool = False,
+        cache_dir: Optional[str] = None,
+        depth: int = _CLONE_DEPTH,
 ) -> Dict[str, Any]:
     """
     Clone 'repo_url' using libgit2 and parse the chosen manifest.
@@ -141,27 +336,73 @@ def load_manifest_from_git(
       manifest_filename: Optional path relative to repo root. If None, uses 'default.xml' (w/ fallbacks).
       workdir:  Optional parent directory for the clone; default is a new temp dir.
       keep_checkout: If True, keep the cloned checkout on disk and return its path in '__checkout_dir'.
+                 Otherwise no working tree is written: files are read from a bare clone's object DB.
+      cache_dir: Optional directory of persistent bare mirrors (default: $KAS_MANIFEST_CACHE, if set;
+                 pass "" to disable). Repeat loads then fetch only new objects and check out from
+                 the local mirror. Without keep_checkout, the parsed manifest is cached too, per
+                 commit: while the branch has not moved, a load is one ls-remote and a file read.
+      depth:    History depth of non-cached clones (default 1, only the tip is read); 0 clones in
+                 full. Mirrors under cache_dir always hold full history.
 
     Returns:
       manifest_data dict for KASExporter; includes '__source' meta.
     """
     if not repo_url:
         raise ValueError("repo_url is required")
+    if cache_dir is None:
+        cache_dir = os.environ.get("KAS_MANIFEST_CACHE")
 
     parent_dir = workdir or tempfile.mkdtemp(prefix="repo-manifests-libgit2-")
     created_parent = workdir is None
     clone_dir = os.path.join(parent_dir, "repo")
+    head_commit: Optional[str]  # stays None on the checkout path when HEAD cannot be resolved
 
     try:
-        # Clone without specifying checkout_branch so we land on provider's default branch.
-        # If 'branch' is provided, we’ll check it out explicitly after cloning.
-        repo = git.clone_repository(repo_url, clone_dir)
+        if not keep_checkout and not (manifest_filename and os.path.isabs(manifest_filename)):
+            # Nothing stays on disk, so skip the working tree: read the manifest and its includes
+            # from the object database of a bare clone (or of the cached mirror itself).
+            if cache_dir:
+                manifest_data = _cached_manifest(repo_url, branch, manifest_filename, cache_dir)
+                if manifest_data is not None:
+                    if created_parent:
+                        shutil.rmtree(parent_dir, ignore_errors=True)
+                    return manifest_data
+                repo = git.Repository(_update_mirror(repo_url, cache_dir))
+            else:
+                repo, _ = _clone_shallow(repo_url, clone_dir, branch, bare=True, depth=depth)
+            manifest_data, active_branch, head_commit, manifest_rel = _load_from_odb(
+                repo, branch, manifest_filename
+            )
+            manifest_data["__source"] = {
+                "type": "git",
+                "repo_url": repo_url,
+                "branch": active_branch,
+                "manifest_filename": manifest_rel,
+                "pulled_at": _utc_now_iso(),
+                "commit": head_commit,
+            }
+            if cache_dir:
+                _store_manifest(manifest_data, repo_url, branch, manifest_filename, cache_dir)
+            shutil.rmtree(clone_dir, ignore_errors=True)
+            if created_parent:
+                shutil.rmtree(parent_dir, ignore_errors=True)
+            return manifest_data
+
+        # Only the tip's manifest is read, so fetch a single commit of the wanted branch (or the
+        # provider's default branch when none is given) instead of the whole history.
+        if cache_dir:
+            # libgit2's local transport cannot clone shallowly; a local clone is cheap anyway
+            mirror = _update_mirror(repo_url, cache_dir)
+            repo, on_branch = git.clone_repository(mirror, clone_dir, checkout_branch=branch), True
+        else:
+            repo, on_branch = _clone_shallow(repo_url, clone_dir, branch, depth=depth)
 
         # Decide which branch to use
         active_branch = branch or _discover_default_branch(repo)  # may still be None (detached or unborn)
         if branch:
-            # User specified branch: checkout it
-            _checkout_branch(repo, branch)
+            # User specified branch: checkout it, unless the clone already landed on it
+            if not on_branch:
+                _checkout_branch(repo, branch)
             active_branch = branch
         else:
             # If we didn't learn an active branch (detached HEAD), try to make one from origin/HEAD.
@@ -193,7 +434,7 @@ def load_manifest_from_git(
             "repo_url": repo_url,
             "branch": active_branch,  # may be None (detached)
             "manifest_filename": os.path.relpath(manifest_path, clone_dir),
-            "pulled_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "pulled_at": _utc_now_iso(),
             "commit": head_commit,
         }
 
@@ -221,6 +462,57 @@ def load_manifest_from_git(
         raise LibGitError(str(e)) from e
 
 
+def load_manifests_from_git(
+        specs: Iterable[Tuple[str, Optional[str], Optional[str]]],
+        *,
+        max_workers: int = 8,
+        workdir: Optional[str] = None,
+        keep_checkout: bool = False,
+        cache_dir: Optional[str] = None,
+        depth: int = _CLONE_DEPTH,
+) -> List[Dict[str, Any]]:
+    """
+    Load several manifests concurrently; clones are network-bound and release the GIL.
+
+    Args:
+      specs: (repo_url, branch, manifest_filename) tuples, as for load_manifest_from_git.
+      max_workers: Upper bound on concurrent clones.
+      workdir: Optional parent directory; each clone gets its own temp dir inside it.
+      keep_checkout, cache_dir, depth: As for load_manifest_from_git.
+
+    Returns:
+      manifest_data dicts in the order of 'specs'. The first failure (in that order) is raised
+      as LibGitError once all clones have finished.
+    """
+    specs = list(specs)
+    if not specs:
+        return []
+
+    total = len(specs)
+    done = 0
+    lock = threading.Lock()
+
+    def load(spec: Tuple[str, Optional[str], Optional[str]]) -> Dict[str, Any]:
+        nonlocal done
+        repo_url, branch, manifest_filename = spec
+        task_dir = tempfile.mkdtemp(prefix="repo-manifests-libgit2-", dir=workdir)
+        try:
+            return load_manifest_from_git(
+                repo_url, branch, manifest_filename,
+                workdir=task_dir, keep_checkout=keep_checkout, cache_dir=cache_dir, depth=depth,
+            )
+        finally:
+            if not keep_checkout:
+                shutil.rmtree(task_dir, ignore_errors=True)
+            with lock:
+                done += 1
+                print(f"Loaded manifest {done}/{total}: {repo_url}", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as executor:
+        futures = [executor.submit(load, spec) for spec in specs]
+    return [f.result() for f in futures]
+
+
 def _discover_repo_root(start_dir: str) -> Optional[str]:
     """
     Find the enclosing git repo workdir (not .git path). Returns None if not in a repo.
@@ -235,15 +527,13 @@ def _discover_repo_root(start_dir: str) -> Optional[str]:
         return None
 
 
-def _is_within(path: str, root: str) -> bool:
+def _is_within(path_real: str, root_real: str) -> bool:
     """
-    Safe containment check using real paths.
+    Safe containment check; both paths must already be resolved with os.path.realpath.
     """
     try:
-        path_real = os.path.realpath(path)
-        root_real = os.path.realpath(root)
         return os.path.commonpath([path_real, root_real]) == root_real
-    except Exception:  # noqa
+    except Exception:  # noqa - e.g. paths on different drives
         return False
 
 
@@ -285,15 +575,20 @@ def load_manifest_from_file(
                 UserWarning,
             )
         else:
-            if not _is_within(manifest_path, repo_root):
+            root_real = os.path.realpath(repo_root)
+            if not _is_within(os.path.realpath(manifest_path), root_real):
                 warnings.warn(
                     f"Manifest '{manifest_path}' is outside the repository root '{repo_root}'.",
                     UserWarning,
                 )
 
+            # Includes usually share a few directories; resolve each directory once
+            real_dir = functools.lru_cache(maxsize=512)(os.path.realpath)
+
             # Validate each include
             for inc in (manifest_data.get("includes") or []):
-                inc_name = inc.get("name")
+                # The parser lists include names; accept {'name': ...} entries as well
+                inc_name = inc.get("name") if isinstance(inc, dict) else inc
                 if not inc_name:
                     continue
                 inc_full = os.path.normpath(os.path.join(manifest_dir, inc_name))
@@ -303,7 +598,11 @@ def load_manifest_from_file(
                         UserWarning,
                     )
                     continue
-                if not _is_within(inc_full, repo_root):
+                if os.path.islink(inc_full):
+                    inc_real = os.path.realpath(inc_full)
+                else:
+                    inc_real = os.path.join(real_dir(os.path.dirname(inc_full)), os.path.basename(inc_full))
+                if not _is_within(inc_real, root_real):
                     warnings.warn(
                         f"Included file '{inc_full}' is outside the repository root '{repo_root}'.",
                         UserWarning,
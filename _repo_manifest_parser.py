@@ -1,50 +1,291 @@
-from typing import Any, Dict, Optional, Tuple, Set
+from typing import Any, Callable, Dict, List, Optional, Tuple, Set
 import os
-import io
+import contextlib
+import hashlib
+import mmap
+import pickle
+import threading
+import time
+from sys import intern
 import xml.etree.ElementTree as ET
-import copy
 import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 
+try:
+    # libxml2-backed; builds large manifest trees several times faster than the stdlib parser
+    from lxml import etree as _lxml  # type: ignore[import-untyped]
+except ImportError:  # optional; fall back to xml.etree
+    _lxml = None
+
+# lxml parsers must not be shared between threads; keep one pair per thread.
+_LXML_PARSERS = threading.local()
+
+# (manifest_dir, blake2b(file bytes)) -> (pickled manifest_data, include file stamps).
+# Pickled because loading it back is several times faster than re-parsing or deep-copying,
+# and every hit must hand out an independent dict.
+_PARSE_CACHE_SIZE = 128
+_PARSE_CACHE: "OrderedDict[Tuple[str, bytes], Tuple[bytes, Tuple[Any, ...]]]" = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def _lxml_parsers() -> Tuple[Any, Any]:
+    """(string parser, file parser) for this thread; both drop comments/PIs like xml.etree."""
+    parsers = getattr(_LXML_PARSERS, "pair", None)
+    if parsers is None:
+        opts = dict(huge_tree=True, collect_ids=False, remove_blank_text=True,
+                    remove_comments=True, remove_pis=True, resolve_entities=False)
+        # Strings were already decoded, so ignore any encoding declaration in them (as ET does)
+        parsers = (_lxml.XMLParser(encoding="utf-8", **opts), _lxml.XMLParser(**opts))
+        _LXML_PARSERS.pair = parsers
+    return parsers
+
+
+def _xml_fromstring(xml_text: str) -> ET.Element:
+    if _lxml is None:
+        return ET.fromstring(xml_text)
+    return _lxml.fromstring(xml_text.encode("utf-8"), _lxml_parsers()[0])
+
+
+# Slice size for feeding a mapped file to lxml's incremental parser
+_FEED_CHUNK = 1 << 16
+
+
+def _xml_frombytes(data: Any) -> ET.Element:
+    """Parse undecoded XML (bytes or an mmap); the XML declaration decides the encoding."""
+    if _lxml is None:
+        return ET.fromstring(data)
+    parser = _lxml_parsers()[1]
+    if isinstance(data, bytes):
+        return _lxml.fromstring(data, parser)
+    # lxml only takes bytes/str, so feed it the mapping in slices rather than copying it whole
+    view = memoryview(data)
+    try:
+        for start in range(0, len(view), _FEED_CHUNK):
+            parser.feed(bytes(view[start:start + _FEED_CHUNK]))
+        return parser.close()
+    except Exception:
+        with contextlib.suppress(Exception):
+            parser.close()  # reset the shared per-thread parser for its next document
+        raise
+    finally:
+        view.release()
+
+
+def _xml_parse_file(path: str) -> ET.Element:
+    if _lxml is None:
+        return ET.parse(path).getroot()
+    return _lxml.parse(path, _lxml_parsers()[1]).getroot()
+
+
+_NOW_ISO: Tuple[int, str] = (-1, "")
+
+
+def _utc_now_iso() -> str:
+    """Current UTC time as stamped into '__source' (seconds); formatted at most once a second."""
+    global _NOW_ISO
+    now = int(time.time())
+    if _NOW_ISO[0] != now:
+        _NOW_ISO = (now, datetime.fromtimestamp(now, tz=timezone.utc).isoformat(timespec="seconds"))
+    return _NOW_ISO[1]
+
+
+def _file_stamp(path: str) -> Tuple[str, Optional[int], Optional[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, st.st_mtime_ns, st.st_size
+
+
+def _parse_cache_get(key: Tuple[str, bytes]) -> Optional[Dict[str, Any]]:
+    with _PARSE_CACHE_LOCK:
+        entry = _PARSE_CACHE.get(key)
+        if entry is not None:
+            _PARSE_CACHE.move_to_end(key)
+    if entry is None:
+        return None
+    blob, stamps = entry
+    # Includes are read from disk while parsing; any change to them invalidates the entry
+    if any(_file_stamp(stamp[0]) != stamp for stamp in stamps):
+        return None
+    return pickle.loads(blob)
+
+
+def _parse_cache_put(key: Tuple[str, bytes], md: Dict[str, Any], include_paths: List[str]) -> None:
+    entry = (pickle.dumps(md, pickle.HIGHEST_PROTOCOL), tuple(_file_stamp(p) for p in include_paths))
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = entry
+        _PARSE_CACHE.move_to_end(key)
+        while len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+
+
+_BOOL_WORDS: Dict[str, bool] = {
+    "1": True, "true": True, "yes": True, "y": True, "on": True,
+    "0": False, "false": False, "no": False, "n": False, "off": False,
+}
+
 
 def _text_bool(val: Optional[str]) -> Optional[bool]:
     if val is None:
         return None
-    v = val.strip().lower()
-    if v in {"1", "true", "yes", "y", "on"}:
-        return True
-    if v in {"0", "false", "no", "n", "off"}:
-        return False
-    return None
+    return _BOOL_WORDS.get(val.strip().lower())
+
+
+# (XML attribute, _Project field, intern?) for project attributes copied verbatim. The interned
+# ones repeat across most projects (remote names, branches, group lists), so share one string.
+_PROJECT_ATTRS = (
+    ("path", "path", False),
+    ("remote", "remote", True),
+    ("revision", "revision", True),
+    ("dest-branch", "dest_branch", True),
+    ("groups", "groups", True),
+    ("upstream", "upstream", True),
+    ("clone-depth", "clone_depth", True),
+)
+# extend-project attributes that overwrite the matching project's fields
+_EXTEND_ATTRS = (
+    ("revision", "revision"),
+    ("remote", "remote"),
+    ("dest-branch", "dest_branch"),
+    ("upstream", "upstream"),
+    ("groups", "groups"),
+)
+
+
+@dataclass(slots=True)
+class _Remote:
+    """Parser-internal <remote> record."""
+    name: str
+    fetch: str = ""
+    pushurl: Optional[str] = None
+    review: Optional[str] = None
+    alias: Optional[str] = None
+    revision: Optional[str] = None  # branch-like
+    annotations: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class _Project:
+    """Parser-internal <project> record; plain dicts are only built for the exporter output."""
+    name: str
+    path: Optional[str] = None
+    remote: Optional[str] = None
+    revision: Optional[str] = None
+    dest_branch: Optional[str] = None
+    groups: Optional[str] = None
+    upstream: Optional[str] = None
+    clone_depth: Optional[str] = None
+    sync_c: Optional[bool] = None
+    sync_s: Optional[bool] = None
+    annotations: List[Dict[str, str]] = field(default_factory=list)
+    copyfiles: List[Dict[str, str]] = field(default_factory=list)
+    linkfiles: List[Dict[str, str]] = field(default_factory=list)
+    subprojects: List["_Project"] = field(default_factory=list)
+    base_rev: Optional[str] = None  # from extend-project
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Manifest-attribute-keyed dict, the form nested subprojects take in 'extras'."""
+        d: Dict[str, Any] = {"name": self.name}
+        for key, attr, _ in _PROJECT_ATTRS:
+            v = getattr(self, attr)
+            if v is not None:
+                d[key] = v
+        if self.sync_c is not None:
+            d["sync-c"] = self.sync_c
+        if self.sync_s is not None:
+            d["sync-s"] = self.sync_s
+        d["annotations"] = self.annotations
+        d["copyfiles"] = self.copyfiles
+        d["linkfiles"] = self.linkfiles
+        return d
+
+
+def _intern_opt(val: Optional[str]) -> Optional[str]:
+    return intern(val) if val is not None else None
+
+
+def _copy_project_attrs(attrib: Any, proj: _Project) -> None:
+    for key, attr, interned in _PROJECT_ATTRS:
+        v = attrib.get(key)
+        if v is not None:
+            setattr(proj, attr, intern(v) if interned else v)
+    proj.sync_c = _text_bool(attrib.get("sync-c"))
+    proj.sync_s = _text_bool(attrib.get("sync-s"))
+
+
+# (extras key, _Project field) carried over into the exporter shape's 'extras' whenever set
+_SHAPE_EXTRAS_FIELDS = (
+    ("dest-branch", "dest_branch"),
+    ("upstream", "upstream"),
+    ("groups", "groups"),
+    ("clone-depth", "clone_depth"),
+    ("sync-c", "sync_c"),
+    ("sync-s", "sync_s"),
+)
 
 
 class RepoManifestParser:
-    def __init__(self) -> None:
+    def __init__(self, read_file: Optional[Callable[[str], Optional[bytes]]] = None) -> None:
+        """
+        read_file: optional include reader (path -> bytes, or None when missing) used instead of
+        the filesystem, e.g. to resolve includes straight from a git tree; include paths are
+        os.path.join(manifest_dir, name).
+        """
+        self._read_file = read_file
         self._seen_includes: Set[Tuple[str, str]] = set()
         self._warned_missing_manifest_dir: bool = False
+        self._include_paths: List[str] = []
+        # directory -> names of the regular files in it, filled lazily during one parse
+        self._dir_files: Dict[str, Set[str]] = {}
 
     def parse_file(self, path: str) -> Dict[str, Any]:
-        manifest_dir = os.path.dirname(os.path.abspath(path))
-        with io.open(path, "r", encoding="utf-8") as f:
-            xml_text = f.read()
-        # Reset per-parse flags
-        self._warned_missing_manifest_dir = False
-        self._seen_includes.clear()
-        md = self.parse_string(xml_text, manifest_dir=manifest_dir)
+        """
+        Parse a manifest file and its on-disk includes. Results are cached per process by file
+        content (and include mtimes/sizes); parse warnings are only emitted on the first parse.
+        """
+        path = os.path.abspath(path)
+        manifest_dir = os.path.dirname(path)
+        with open(path, "rb") as f:
+            try:
+                # Hash and parse straight from the page cache, without a bytes/str copy of the file
+                data: Any = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty files cannot be mapped
+                data = f.read()
+        try:
+            key = (manifest_dir, hashlib.blake2b(data, digest_size=16).digest())
+            md = _parse_cache_get(key)
+            if md is None:
+                md = self.parse_bytes(data, manifest_dir=manifest_dir)
+                _parse_cache_put(key, md, self._include_paths)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
         # Stamp source metadata (local file)
         md["__source"] = {
             "type": "file",
-            "filename": os.path.abspath(path),
-            "parsed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "filename": path,
+            "parsed_at": _utc_now_iso(),
         }
         return md
 
     def parse_string(self, xml_text: str, manifest_dir: Optional[str] = None) -> Dict[str, Any]:
+        return self._parse_root(_xml_fromstring(xml_text), manifest_dir)
+
+    def parse_bytes(self, data: Any, manifest_dir: Optional[str] = None) -> Dict[str, Any]:
+        """Like parse_string, for undecoded XML (bytes or any buffer such as an mmap)."""
+        return self._parse_root(_xml_frombytes(data), manifest_dir)
+
+    def _parse_root(self, root: ET.Element, manifest_dir: Optional[str]) -> Dict[str, Any]:
         # Reset per-parse flags
         self._warned_missing_manifest_dir = False
         self._seen_includes.clear()
+        self._include_paths = []
+        self._dir_files = {}
 
-        root = ET.fromstring(xml_text)
         if root.tag != "manifest":
             raise ValueError("Root element must be <manifest>")
         state = self._empty_state()
@@ -61,9 +302,9 @@ class RepoManifestParser:
     @staticmethod
     def _empty_state() -> Dict[str, Any]:
         return {
-            "remotes": {},  # name -> { fetch, review, pushurl, alias, revision, annotations[] }
+            "remotes": {},  # name -> _Remote
             "default": {},  # { remote, revision, dest-branch, upstream, sync-j, sync-c, sync-s, sync-tags }
-            "projects": [],  # list of project dicts (see _make_project)
+            "projects": [],  # list of _Project
             "extend": [],  # list of extend-project ops
             "remove": [],  # list of remove-project ops
             "includes": [],  # resolved (path, groups, revision) for info only
@@ -72,22 +313,31 @@ class RepoManifestParser:
         }
 
     def _process_manifest(self, root: ET.Element, state: Dict[str, Any], manifest_dir: Optional[str]) -> None:
-        # order matters a bit: collect remotes/default first
+        # Bucket the children in a single pass; document order is kept within each bucket
+        remotes: List[ET.Element] = []
+        defaults: List[ET.Element] = []
+        nested: List[ET.Element] = []
+        rest: List[ET.Element] = []
+        buckets = {"remote": remotes, "default": defaults, "include": nested, "submanifest": nested}
         for child in root:
-            if child.tag == "remote":
-                self._add_remote(child, state)
-            elif child.tag == "default":
-                self._merge_default(child, state)
+            buckets.get(child.tag, rest).append(child)
+
+        # order matters a bit: collect remotes/default first
+        for child in remotes:
+            self._add_remote(child, state)
+        for child in defaults:
+            self._merge_default(child, state)
 
         # then includes/submanifest to bring in more remotes/defaults before projects
-        for child in root:
+        prefetched = self._prefetch_includes(nested, manifest_dir) if self._read_file is None else None
+        for child in nested:
             if child.tag == "include":
-                self._handle_include(child, state, manifest_dir)
-            elif child.tag == "submanifest":
+                self._handle_include(child, state, manifest_dir, prefetched)
+            else:
                 self._handle_submanifest(child, state, manifest_dir)
 
         # now core project definitions + modifiers & metadata
-        for child in root:
+        for child in rest:
             tag = child.tag
             if tag == "project":
                 self._add_project(child, state)
@@ -103,28 +353,23 @@ class RepoManifestParser:
                 state["extras"]["superproject"] = dict(child.attrib)
             elif tag == "contactinfo":
                 state["extras"]["contactinfo"] = dict(child.attrib)
-            elif tag in ("remote", "default", "include", "submanifest"):
-                pass
             else:
-                state["extras"].setdefault("unknown", []).append({tag: copy.deepcopy(child.attrib)})
+                state["extras"].setdefault("unknown", []).append({tag: dict(child.attrib)})
 
     # ------------------------------ ELEMENT HANDLERS --------------------------
 
     @staticmethod
     def _add_remote(el: ET.Element, state: Dict[str, Any]) -> None:
         name = el.attrib["name"]
-        r = {
-            "name": name,
-            "fetch": el.attrib.get("fetch", ""),
-            "pushurl": el.attrib.get("pushurl"),
-            "review": el.attrib.get("review"),
-            "alias": el.attrib.get("alias"),
-            "revision": el.attrib.get("revision"),  # branch-like
-            "annotations": [],
-        }
-        for ann in el.findall("annotation"):
-            r["annotations"].append(dict(ann.attrib))
-        state["remotes"][name] = r
+        state["remotes"][name] = _Remote(
+            name=name,
+            fetch=intern(el.attrib.get("fetch", "")),
+            pushurl=el.attrib.get("pushurl"),
+            review=el.attrib.get("review"),
+            alias=el.attrib.get("alias"),
+            revision=_intern_opt(el.attrib.get("revision")),
+            annotations=[dict(ann.attrib) for ann in el.findall("annotation")],
+        )
 
     @staticmethod
     def _merge_default(el: ET.Element, state: Dict[str, Any]) -> None:
@@ -133,7 +378,32 @@ class RepoManifestParser:
             if el.attrib.get(k) is not None:
                 d[k] = el.attrib.get(k)
 
-    def _handle_include(self, el: ET.Element, state: Dict[str, Any], manifest_dir: Optional[str]) -> None:
+    def _prefetch_includes(self, nested: List[ET.Element], manifest_dir: Optional[str]) -> Dict[str, Future]:
+        """
+        Parse this manifest's include files concurrently (path -> Future[root]). Only with lxml,
+        which releases the GIL while parsing; merging still happens in order on the caller's thread.
+        """
+        if _lxml is None or not manifest_dir:
+            return {}
+        paths = [
+            p for p in dict.fromkeys(
+                os.path.join(manifest_dir, el.attrib["name"])
+                for el in nested if el.tag == "include" and "name" in el.attrib
+            )
+            if self._include_exists(p)
+        ]
+        if len(paths) < 2:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as executor:
+            return {p: executor.submit(_xml_parse_file, p) for p in paths}
+
+    def _handle_include(
+            self,
+            el: ET.Element,
+            state: Dict[str, Any],
+            manifest_dir: Optional[str],
+            prefetched: Optional[Dict[str, Future]] = None,
+    ) -> None:
         name = el.attrib["name"]
         state["includes"].append(dict(el.attrib))
 
@@ -155,16 +425,39 @@ class RepoManifestParser:
         self._seen_includes.add(include_key)
 
         inc_path = os.path.join(manifest_dir, name)
-        if os.path.isfile(inc_path):
-            sub = ET.parse(inc_path).getroot()
+        self._include_paths.append(inc_path)
+        sub: Optional[ET.Element] = None
+        if self._read_file is not None:
+            data = self._read_file(inc_path)
+            if data is not None:
+                sub = _xml_frombytes(data)
+        elif self._include_exists(inc_path):
+            future = prefetched.get(inc_path) if prefetched else None
+            sub = future.result() if future is not None else _xml_parse_file(inc_path)
+        if sub is not None:
             self._process_manifest(sub, state, manifest_dir=os.path.dirname(inc_path))
         else:
             # We do have manifest_dir, but file isn't present—warn specifically for this case.
+            where = "in the manifest source" if self._read_file is not None else "on disk"
             warnings.warn(
-                f"Include file not found on disk: {inc_path!r}. Skipping this include.",
+                f"Include file not found {where}: {inc_path!r}. Skipping this include.",
                 UserWarning,
             )
 
+    def _include_exists(self, inc_path: str) -> bool:
+        """os.path.isfile for include paths, answered from one scandir per directory."""
+        dir_name, base = os.path.split(inc_path)
+        files = self._dir_files.get(dir_name)
+        if files is None:
+            try:
+                with os.scandir(dir_name or ".") as it:
+                    files = {e.name for e in it if e.is_file()}
+            except OSError:
+                files = set()
+            self._dir_files[dir_name] = files
+        # A miss may just be a case-insensitive filesystem; confirm it with a stat
+        return base in files or os.path.isfile(inc_path)
+
     @staticmethod
     def _handle_submanifest(el: ET.Element, state: Dict[str, Any], manifest_dir: Optional[str]) -> None:
         info = dict(el.attrib)
@@ -172,37 +465,30 @@ class RepoManifestParser:
         # Keep as breadcrumb; environment-specific resolution can be added later.
 
     def _add_project(self, el: ET.Element, state: Dict[str, Any]) -> None:
-        a = el.attrib
-        name = a["name"]
-        proj = self._make_project(name=name)
-        for k in ("path", "remote", "revision", "dest-branch", "groups", "upstream", "clone-depth"):
-            if a.get(k) is not None:
-                proj[k] = a[k]
-        for k in ("sync-c", "sync-s"):
-            b = _text_bool(a.get(k))
-            if b is not None:
-                proj[k] = b
-        proj["annotations"] = [dict(x.attrib) for x in el.findall("annotation")]
-        proj["copyfiles"] = [dict(x.attrib) for x in el.findall("copyfile")]
-        proj["linkfiles"] = [dict(x.attrib) for x in el.findall("linkfile")]
-        nested = el.findall("project")
-        if nested:
-            proj["subprojects"] = []
-            for sub in nested:
-                subp = self._make_project(name=sub.attrib["name"])
-                for k in ("path", "remote", "revision", "dest-branch", "groups", "upstream", "clone-depth"):
-                    if sub.attrib.get(k) is not None:
-                        subp[k] = sub.attrib[k]
-                for k in ("sync-c", "sync-s"):
-                    b = _text_bool(sub.attrib.get(k))
-                    if b is not None:
-                        subp[k] = b
-                subp["annotations"] = [dict(x.attrib) for x in sub.findall("annotation")]
-                subp["copyfiles"] = [dict(x.attrib) for x in sub.findall("copyfile")]
-                subp["linkfiles"] = [dict(x.attrib) for x in sub.findall("linkfile")]
-                proj["subprojects"].append(subp)
+        proj = _Project(name=el.attrib["name"])
+        _copy_project_attrs(el.attrib, proj)
+        for sub in self._collect_children(el, proj):
+            subp = _Project(name=sub.attrib["name"])
+            _copy_project_attrs(sub.attrib, subp)
+            self._collect_children(sub, subp)
+            proj.subprojects.append(subp)
         state["projects"].append(proj)
 
+    @staticmethod
+    def _collect_children(el: ET.Element, proj: _Project) -> List[ET.Element]:
+        """Fill annotations/copyfiles/linkfiles in one pass over el; returns nested <project>s."""
+        buckets = {"annotation": proj.annotations, "copyfile": proj.copyfiles, "linkfile": proj.linkfiles}
+        nested: List[ET.Element] = []
+        for child in el:
+            tag = child.tag
+            if tag == "project":
+                nested.append(child)
+            else:
+                bucket = buckets.get(tag)
+                if bucket is not None:
+                    bucket.append(dict(child.attrib))
+        return nested
+
     @staticmethod
     def _queue_extend(el: ET.Element, state: Dict[str, Any]) -> None:
         state["extend"].append(dict(el.attrib))
@@ -221,48 +507,43 @@ class RepoManifestParser:
     def _apply_remove_project(state: Dict[str, Any]) -> None:
         if not state["remove"]:
             return
-        keep = []
-        for p in state["projects"]:
-            removed = False
-            for r in state["remove"]:
-                by_name = (r.get("name") and r["name"] == p["name"])
-                by_path = (r.get("path") and r["path"] == p.get("path"))
-
-                def both_or_either() -> bool:
-                    if r.get("name") and r.get("path"):
-                        return by_name and by_path
-                    if r.get("name"):
-                        return by_name
-                    if r.get("path"):
-                        return by_path
-                    return False
-
-                if both_or_either():
-                    removed = True
-                    break
-            if not removed:
-                keep.append(p)
-        state["projects"] = keep
+        # A remove op with both name and path must match both; with only one, just that one
+        names: Set[str] = set()
+        paths: Set[str] = set()
+        pairs: Set[Tuple[str, str]] = set()
+        for r in state["remove"]:
+            name, path = r.get("name"), r.get("path")
+            if name and path:
+                pairs.add((name, path))
+            elif name:
+                names.add(name)
+            elif path:
+                paths.add(path)
+        state["projects"] = [
+            p for p in state["projects"]
+            if not (p.name in names or p.path in paths or (p.name, p.path) in pairs)
+        ]
 
     @staticmethod
     def _apply_extend_project(state: Dict[str, Any]) -> None:
         if not state["extend"]:
             return
+        by_name: Dict[str, List[_Project]] = {}
+        for p in state["projects"]:
+            by_name.setdefault(p.name, []).append(p)
         for e in state["extend"]:
-            name = e.get("name")
             path = e.get("path")
-            for p in state["projects"]:
-                if p["name"] != name:
+            # The path is checked at apply time: an earlier op's dest-path may have moved it
+            for p in by_name.get(e.get("name"), ()):
+                if path and p.path != path:
                     continue
-                if path and p.get("path") != path:
-                    continue
-                for k in ("revision", "remote", "dest-branch", "upstream", "groups"):
-                    if e.get(k) is not None:
-                        p[k] = e[k]
+                for key, attr in _EXTEND_ATTRS:
+                    if e.get(key) is not None:
+                        setattr(p, attr, e[key])
                 if e.get("base-rev") is not None:
-                    p.setdefault("extras", {})["base-rev"] = e["base-rev"]
+                    p.base_rev = e["base-rev"]
                 if e.get("dest-path") is not None:
-                    p["path"] = e["dest-path"]
+                    p.path = e["dest-path"]
 
     # ------------------------------ STATE -> EXPORTER -------------------------
 
@@ -275,7 +556,7 @@ class RepoManifestParser:
         }
 
         for name, r in state["remotes"].items():
-            md["remote"].append({"name": name, "fetch": r.get("fetch", "")})
+            md["remote"].append({"name": name, "fetch": r.fetch})
 
         d = {}
         if state["default"].get("remote"):
@@ -288,8 +569,13 @@ class RepoManifestParser:
         if d:
             md["default"].append(d)
 
-        for p in state["projects"]:
-            md["project"].append(self._project_to_exporter_shape(p, state))
+        remotes = state["remotes"]
+        default_remote = state["default"].get("remote")
+        default_revision = state["default"].get("revision")
+        md["project"] = [
+            self._project_to_exporter_shape(p, remotes, default_remote, default_revision)
+            for p in state["projects"]
+        ]
 
         if state["includes"]:
             md.setdefault("includes", [])
@@ -298,49 +584,51 @@ class RepoManifestParser:
         return md
 
     @staticmethod
-    def _project_to_exporter_shape(p: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    def _project_to_exporter_shape(
+            p: _Project,
+            remotes: Dict[str, _Remote],
+            default_remote: Optional[str],
+            default_revision: Optional[str],
+    ) -> Dict[str, Any]:
         out: Dict[str, Any] = {
-            "name": p["name"],
-            "path": p.get("path", p["name"]),
+            "name": p.name,
+            "path": p.path if p.path is not None else p.name,
         }
-        remote = p.get("remote") or state["default"].get("remote")
+        remote = p.remote or default_remote
         if remote:
             out["remote"] = remote
 
-        rev = p.get("revision")
-        if rev is None and remote and state["remotes"].get(remote, {}).get("revision"):
-            rev = state["remotes"][remote]["revision"]
-        if rev is None and state["default"].get("revision"):
-            rev = state["default"]["revision"]
+        rev = p.revision
+        if rev is None and remote:
+            r = remotes.get(remote)
+            rev = (r.revision if r is not None else None) or None
+        if rev is None and default_revision:
+            rev = default_revision
         if rev is not None:
             out["revision"] = rev
 
         # Map repo-manifest's 'upstream' (and fallback 'dest-branch') to kas 'branch'
-        upstream = p.get("upstream")
-        dest_branch = p.get("dest-branch")
+        upstream = p.upstream
+        dest_branch = p.dest_branch
         if upstream:
             out["branch"] = upstream
         elif dest_branch:
             out["branch"] = dest_branch
 
-        extras_fields = ("dest-branch", "upstream", "groups", "clone-depth", "sync-c", "sync-s")
-        for k in extras_fields:
-            if p.get(k) is not None:
-                out.setdefault("extras", {})[k] = p[k]
-
-        if p.get("annotations"):
-            out.setdefault("extras", {})["annotations"] = p["annotations"]
-        if p.get("copyfiles"):
-            out.setdefault("extras", {})["copyfiles"] = p["copyfiles"]
-        if p.get("linkfiles"):
-            out.setdefault("extras", {})["linkfiles"] = p["linkfiles"]
-        if p.get("subprojects"):
-            out.setdefault("extras", {})["subprojects"] = p["subprojects"]
+        extras: Dict[str, Any] = {}
+        for key, attr in _SHAPE_EXTRAS_FIELDS:
+            v = getattr(p, attr)
+            if v is not None:
+                extras[key] = v
+        if p.annotations:
+            extras["annotations"] = p.annotations
+        if p.copyfiles:
+            extras["copyfiles"] = p.copyfiles
+        if p.linkfiles:
+            extras["linkfiles"] = p.linkfiles
+        if p.subprojects:
+            extras["subprojects"] = [sub.to_dict() for sub in p.subprojects]
+        if extras:
+            out["extras"] = extras
 
         return out
-
-    # ------------------------------ HELPERS -----------------------------------
-
-    @staticmethod
-    def _make_project(name: str) -> Dict[str, Any]:
-        return {"name": name}
@@ -1,28 +1,124 @@
+import base64
+import contextlib
+import functools
 import os
 import re
+import sqlite3
+import time
 import urllib.parse
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
-from _http_client import HttpClient
-from typing import Dict, List, Optional
+from _http_client import (
+    ConnectionPool, DiskResponseCache, HostThrottle, HttpClient, HttpRequestError, ResponseCache,
+)
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+# Tree loops test "_CONF_TARGET in p" before endswith: the operator skips the method call, and
+# nearly every entry fails it
 _CONF_TARGET = "conf/layer.conf"
+_CONF_TARGET_LEN = len(_CONF_TARGET)
+_GITLAB_PAGE_WINDOW = 8  # tree pages requested concurrently once a listing spans several
+_GITLAB_DIR_WORKERS = 8  # concurrent directory listings in the non-recursive fallback
+_GITHUB_TREE_WORKERS = 8  # concurrent subtree listings when a recursive tree is truncated
+_CGIT_WORKERS = 8  # concurrent cgit tree-page fetches
+_LOCAL_SKIP_DIRS = frozenset((".git", ".repo"))  # VCS metadata never holds checked-out layers
+
+# Shared by every scanner's clients, so scanning many repos on one host reuses its TLS sockets
+# and revalidates earlier responses instead of refetching them
+_POOL = ConnectionPool()
+# Likewise shared: concurrent scanners stay within one per-host cap, and a rate limit seen by
+# any of them backs all of them off that host
+_THROTTLE = HostThrottle(_POOL.maxsize)
+
+
+def _response_cache() -> ResponseCache:
+    """In-memory by default; $KAS_HTTP_CACHE names a directory that keeps ETags across runs."""
+    cache_dir = os.environ.get("KAS_HTTP_CACHE")
+    return DiskResponseCache(cache_dir) if cache_dir else ResponseCache()
+
+
+_RESPONSE_CACHE = _response_cache()
+
+# With $KAS_HTTP_CACHE set, GitHub rev -> SHA resolutions are also kept for a short while, which
+# skips the commit lookups (2 requests for the default branch) on back-to-back runs
+_SHA_TTL = 60.0  # branches and the default branch move; trust a resolution for a minute
+_SHA_PINNED_TTL = 86400.0  # a full commit id only resolves to itself
+_FULL_SHA_RE = re.compile(r"(?:[0-9a-fA-F]{40}|[0-9a-fA-F]{64})\Z")
+
+
+def _sha_cache_path() -> Optional[str]:
+    cache_dir = os.environ.get("KAS_HTTP_CACHE")
+    return os.path.join(cache_dir, "github-sha.sqlite") if cache_dir else None
+
+
+def _sha_cache_get(key: str) -> Optional[str]:
+    path = _sha_cache_path()
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with contextlib.closing(sqlite3.connect(path, timeout=5.0)) as db:
+            row = db.execute(
+                "SELECT sha FROM sha_cache WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _sha_cache_put(key: str, sha: str, ttl: float) -> None:
+    path = _sha_cache_path()
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with contextlib.closing(sqlite3.connect(path, timeout=5.0)) as db, db:
+            db.execute("CREATE TABLE IF NOT EXISTS sha_cache(key TEXT PRIMARY KEY, sha TEXT, expires REAL)")
+            db.execute("INSERT OR REPLACE INTO sha_cache VALUES (?, ?, ?)", (key, sha, time.time() + ttl))
+    except (OSError, sqlite3.Error):
+        pass  # caching is best effort
+
 
 # cgit quick signals
 _CGIT_META = re.compile(r'<meta[^>]+name=["\']generator["\'][^>]+content=["\']cgit\b', re.I)
 _CGIT_CSS = re.compile(r'href=["\'][^"\']*cgit\.css\b', re.I)
 _CGIT_ID = re.compile(r'id=["\']cgit["\']', re.I)
 
+# cgit tree-page links to directories/files (tree) and to raw files (plain)
+_RE_TREE_HREF = re.compile(r'href="(?:/[^"]+)?/tree/([^"?#]+)\?h=[^"]*"')
+_RE_PLAIN_HREF = re.compile(r'href="(?:/[^"]+)?/plain/([^"?#]+)\?h=[^"]*"')
+
+# RFC 8288 Link header entry pointing at the following page
+_LINK_NEXT_RE = re.compile(r'rel="?next"?', re.I)
+
+# Process-wide cgit detection results: (scheme, host) -> True once any repo there looked like cgit,
+# and ((scheme, host), project) -> probe result for repos on hosts not (yet) known to be cgit
+_CGIT_HOSTS: Dict[Tuple[str, str], bool] = {}
+_CGIT_PROBES: Dict[Tuple[Tuple[str, str], Optional[str]], bool] = {}
 
+
+def _gitlab_last_page(headers: Any) -> Optional[int]:
+    """Page count from GitLab's pagination headers; None when they don't tell (e.g. huge listings)."""
+    if not headers:
+        return None
+    total = headers.get("X-Total-Pages")
+    if total and total.strip().isdigit():
+        return int(total)
+    link = headers.get("Link")
+    if link is not None and not _LINK_NEXT_RE.search(link):
+        return 1  # this (first) page has no rel="next": it is the last one
+    return None
+
+
+@functools.lru_cache(maxsize=256)
 def _strip_git_suffix(name: str) -> str:
     return name[:-4] if name.endswith(".git") else name
 
 
+@functools.lru_cache(maxsize=32)  # one credential is typically shared by every scanner in a run
 def _parse_basic_auth(auth: Optional[str]) -> Optional[str]:
     if not auth or ":" not in auth:
         return None
     # RFC 7617 Basic base64(user:pass); HttpClient expects headers, so we pass Authorization directly
-    import base64
     raw = auth.encode("utf-8")
     b64 = base64.b64encode(raw).decode("ascii")
     return f"Basic {b64}"
@@ -52,12 +148,18 @@ class RemoteLayerScanner:
             user_agent="RemoteLayerScanner/fast-auth-1.0",
             max_retries=1,  # fail fast on rate limit
             max_sleep=1.0,
+            pool=_POOL,
+            response_cache=_RESPONSE_CACHE,
+            throttle=_THROTTLE,
         )
         self._http_html = HttpClient(
             timeout=min(self.timeout, 8.0),
             user_agent="RemoteLayerScanner/fast-auth-1.0",
             max_retries=0,  # no retries for HTML scraping
             max_sleep=0.0,
+            pool=_POOL,
+            response_cache=_RESPONSE_CACHE,
+            throttle=_THROTTLE,
         )
 
         # Build HTML auth header (for cgit/basic) if provided
@@ -97,15 +199,27 @@ class RemoteLayerScanner:
     # ---------- LOCAL ----------
     @staticmethod
     def _scan_local(root: str) -> List[str]:
-        import os
         layers: set[str] = set()
         root = os.path.abspath(root)
-        for dirpath, dirnames, filenames in os.walk(root):
-            if "layer.conf" in filenames and os.path.basename(dirpath) == "conf":
-                layer_dir = os.path.relpath(os.path.dirname(dirpath), root)
-                if layer_dir == ".":
-                    continue
-                layers.add(layer_dir.replace("\\", "/"))
+        stack = [root]
+        while stack:
+            dirpath = stack.pop()
+            in_conf = os.path.basename(dirpath) == "conf"
+            try:
+                it = os.scandir(dirpath)
+            except OSError:
+                continue  # unreadable directory; os.walk skipped these silently too
+            with it:
+                for entry in it:
+                    # Classified like os.walk: symlinks to directories count as directories but
+                    # are not descended into
+                    if entry.is_dir():
+                        if entry.name not in _LOCAL_SKIP_DIRS and not entry.is_symlink():
+                            stack.append(entry.path)
+                    elif in_conf and entry.name == "layer.conf":
+                        layer_dir = os.path.relpath(os.path.dirname(dirpath), root)
+                        if layer_dir != ".":
+                            layers.add(layer_dir.replace("\\", "/"))
         return sorted(layers)
 
     # ---------- GITHUB ----------
@@ -127,6 +241,25 @@ class RemoteLayerScanner:
             headers.update(self.extra_headers)
 
         # Resolve SHA
+        sha_key = f"{owner}/{repo}/{self.rev or ''}"
+        sha = _sha_cache_get(sha_key)
+        if sha is None:
+            sha = self._resolve_github_sha(base_api, headers)
+            pinned = _FULL_SHA_RE.match(self.rev or "") is not None
+            _sha_cache_put(sha_key, sha, _SHA_PINNED_TTL if pinned else _SHA_TTL)
+
+        tree = self._http_api.get_json(f"{base_api}/git/trees/{sha}?recursive=1", headers)
+        if not (isinstance(tree, dict) and "tree" in tree):
+            raise ValueError("Unexpected response from GitHub trees API")
+
+        layers: set[str] = set()
+        self._collect_github_layers(tree, "", layers)
+        if tree.get("truncated"):
+            # Too large for one recursive listing: list the root flat and recurse per subtree
+            self._walk_github_subtrees(base_api, headers, {sha: [""]}, layers)
+        return sorted(layers)
+
+    def _resolve_github_sha(self, base_api: str, headers: Dict[str, str]) -> str:
         if self.rev:
             info = self._http_api.get_json(f"{base_api}/commits/{urllib.parse.quote(self.rev)}", headers)
             if not (isinstance(info, dict) and "sha" in info):
@@ -141,19 +274,49 @@ class RemoteLayerScanner:
             if not (isinstance(info, dict) and "sha" in info):
                 raise ValueError(f"Could not resolve default branch {default_branch!r} on GitHub")
             sha = info["sha"]
+        return sha
 
-        tree = self._http_api.get_json(f"{base_api}/git/trees/{sha}?recursive=1", headers)
-        if not (isinstance(tree, dict) and "tree" in tree):
-            raise ValueError("Unexpected response from GitHub trees API")
-
-        layers: set[str] = set()
+    @staticmethod
+    def _collect_github_layers(tree: Dict[str, Any], prefix: str, layers: set) -> None:
         for entry in tree.get("tree", []):
             p = entry.get("path", "")
-            if p.endswith(_CONF_TARGET):
-                layer_dir = p[: -len(_CONF_TARGET)].rstrip("/")
+            if prefix:
+                p = f"{prefix}/{p}"  # the subtree may itself be a conf/ directory
+            if _CONF_TARGET in p and p.endswith(_CONF_TARGET):
+                layer_dir = p[:-_CONF_TARGET_LEN].rstrip("/")
                 if layer_dir:
                     layers.add(layer_dir)
-        return sorted(layers)
+
+    def _walk_github_subtrees(self, base_api: str, headers: Dict[str, str],
+                              truncated: Dict[str, List[str]], layers: set) -> None:
+        """
+        Cover trees whose recursive listing came back truncated (sha -> the paths it sits at).
+        Each is listed flat; its child trees are then listed recursively, concurrently, and the
+        ones still truncated go round again. Identical subtrees are fetched once.
+        """
+        def fetch(shas: Iterable[str], query: str) -> Iterator[Tuple[str, Any]]:
+            urls = {f"{base_api}/git/trees/{sha}{query}": sha for sha in shas}
+            for url, tree in self._http_api.get_many_json(urls, headers, max_workers=_GITHUB_TREE_WORKERS):
+                if not (isinstance(tree, dict) and "tree" in tree):
+                    raise ValueError("Unexpected response from GitHub trees API")
+                yield urls[url], tree
+
+        while truncated:
+            children: Dict[str, List[str]] = {}
+            for sha, tree in fetch(truncated, ""):
+                for prefix in truncated[sha]:
+                    self._collect_github_layers(tree, prefix, layers)
+                    for entry in tree["tree"]:
+                        if entry.get("type") == "tree":
+                            path = f"{prefix}/{entry['path']}" if prefix else entry["path"]
+                            children.setdefault(entry["sha"], []).append(path)
+
+            truncated = {}
+            for sha, tree in fetch(children, "?recursive=1"):
+                for prefix in children[sha]:
+                    self._collect_github_layers(tree, prefix, layers)
+                if tree.get("truncated"):
+                    truncated[sha] = children[sha]
 
     # ---------- GITLAB ----------
     def _scan_gitlab(self, parsed: urllib.parse.ParseResult) -> List[str]:
@@ -188,61 +351,90 @@ class RemoteLayerScanner:
             if not ref:
                 raise ValueError("Could not resolve a default branch on GitLab (tried 'main' and 'master').")
 
-        layers: set[str] = set()
-        page = 1
         per_page = 100
-        while True:
-            url = (
+
+        def page_url(page: int) -> str:
+            return (
                 f"{base_api}/repository/tree"
                 f"?ref={urllib.parse.quote(ref)}&recursive=true&per_page={per_page}&page={page}"
             )
+
+        layers: set[str] = set()
+        next_page = 1
+        last_page: Optional[int] = None
+        while True:
+            # Page 1 comes alone; its pagination headers usually give the page count, and the rest
+            # is then fetched concurrently in one go. Without them, fetch a window of pages at a
+            # time; pages past the end come back empty and are simply not reached.
+            if next_page == 1:
+                urls = [page_url(1)]
+            else:
+                end = last_page + 1 if last_page is not None else next_page + _GITLAB_PAGE_WINDOW
+                urls = [page_url(p) for p in range(next_page, end)]
             try:
-                entries = self._http_api.get_json(url, headers)
-            except urllib.error.HTTPError as e:
-                if e.code in (400, 422):
+                if next_page == 1:
+                    entries, resp_headers = self._http_api.get_json_with_headers(urls[0], headers)
+                    results = {urls[0]: entries}
+                    last_page = _gitlab_last_page(resp_headers)
+                else:
+                    results = dict(self._http_api.get_many_json(
+                        urls, headers, max_workers=min(len(urls), _GITLAB_PAGE_WINDOW)))
+            except HttpRequestError as e:
+                if e.status in (400, 422):
                     return self._scan_gitlab_dfs(base_api, headers, ref)
                 raise
+            next_page += len(urls)
+
+            done = False
+            for url in urls:  # in page order, stopping where the serial walk would have
+                entries = results[url]
+                if not isinstance(entries, list):
+                    if isinstance(entries, dict) and entries.get("message"):
+                        raise ValueError(f"GitLab API error: {entries.get('message')}")
+                    done = True
+                    break
 
-            if not isinstance(entries, list):
-                if isinstance(entries, dict) and entries.get("message"):
-                    raise ValueError(f"GitLab API error: {entries.get('message')}")
-                break
-
-            for entry in entries:
-                if entry.get("type") == "blob":
-                    path = entry.get("path", "")
-                    if path.endswith(_CONF_TARGET):
-                        layer_dir = path[: -len(_CONF_TARGET)].rstrip("/")
-                        if layer_dir:
-                            layers.add(layer_dir)
+                for entry in entries:
+                    if entry.get("type") == "blob":
+                        path = entry.get("path", "")
+                        if _CONF_TARGET in path and path.endswith(_CONF_TARGET):
+                            layer_dir = path[:-_CONF_TARGET_LEN].rstrip("/")
+                            if layer_dir:
+                                layers.add(layer_dir)
 
-            if len(entries) < per_page:
+                if len(entries) < per_page:
+                    done = True
+                    break
+            if done or (last_page is not None and next_page > last_page):
                 break
-            page += 1
 
         return sorted(layers)
 
     def _scan_gitlab_dfs(self, base_api: str, headers: Dict[str, str], ref: str) -> List[str]:
-        layers: set[str] = set()
-        stack = [""]
-        while stack:
-            prefix = stack.pop()
-            url = (
+        def dir_url(prefix: str) -> str:
+            return (
                 f"{base_api}/repository/tree"
                 f"?ref={urllib.parse.quote(ref)}&path={urllib.parse.quote(prefix)}&per_page=100"
             )
-            entries = self._http_api.get_json(url, headers)
-            if not isinstance(entries, list):
-                continue
-            for e in entries:
-                p = e.get("path", "")
-                typ = e.get("type")
-                if typ == "tree":
-                    stack.append(p)
-                elif typ == "blob" and p.endswith(_CONF_TARGET):
-                    layer_dir = p[: -len(_CONF_TARGET)].rstrip("/")
-                    if layer_dir:
-                        layers.add(layer_dir)
+
+        # Level by level: each directory listing is independent, so a whole level is fetched at once
+        layers: set[str] = set()
+        frontier = [""]
+        while frontier:
+            urls = [dir_url(prefix) for prefix in frontier]
+            frontier = []
+            for _, entries in self._http_api.get_many_json(urls, headers, max_workers=_GITLAB_DIR_WORKERS):
+                if not isinstance(entries, list):
+                    continue
+                for e in entries:
+                    p = e.get("path", "")
+                    typ = e.get("type")
+                    if typ == "tree":
+                        frontier.append(p)
+                    elif typ == "blob" and _CONF_TARGET in p and p.endswith(_CONF_TARGET):
+                        layer_dir = p[:-_CONF_TARGET_LEN].rstrip("/")
+                        if layer_dir:
+                            layers.add(layer_dir)
         return sorted(layers)
 
     # ---------- CGIT ----------
@@ -272,83 +464,96 @@ class RemoteLayerScanner:
                 return f"{base}/tree/{urllib.parse.quote(path)}?h={urllib.parse.quote(rev)}"
             return f"{base}/tree/?h={urllib.parse.quote(rev)}"
 
-        layers: set[str] = set()
-        visited: set[str] = set()
-        stack: List[str] = [""]
-
-        re_tree_href = re.compile(r'href="(?:/[^"]+)?/tree/([^"?#]+)\?h=[^"]*"')
-        re_plain_href = re.compile(r'href="(?:/[^"]+)?/plain/([^"?#]+)\?h=[^"]*"')
-
-        while stack:
-            prefix = stack.pop()
-            if prefix in visited:
-                continue
-            visited.add(prefix)
-
-            url = tree_url(prefix)
+        def fetch(prefix: str) -> Optional[str]:
             try:
-                html = self._http_html.get_text(url, self._auth_html_header)
-            except urllib.error.HTTPError as e:
-                if e.code in (404, 410):
-                    continue
+                return self._http_html.get_text(tree_url(prefix), self._auth_html_header)
+            except HttpRequestError as e:
+                if e.status in (404, 410):
+                    return None
                 raise
             except Exception:  # noqa
-                continue
+                return None
 
-            tree_paths = set(re_tree_href.findall(html))
-            plain_paths = set(re_plain_href.findall(html))  # files
-
-            for p in tree_paths:
-                if p.endswith(_CONF_TARGET):
-                    layer_dir = p[: -len(_CONF_TARGET)].rstrip("/")
-                    if layer_dir:
-                        layers.add(layer_dir)
-
-            for p in tree_paths:
-                if prefix and not p.startswith(prefix.rstrip("/") + "/"):
-                    continue
-                if p in plain_paths:
-                    continue
-                if p.endswith(_CONF_TARGET):
-                    continue
-                if "/" in p and p.rsplit("/", 1)[-1].count(".") > 0:
-                    continue
+        layers: set[str] = set()
+        visited: set[str] = set()
+        frontier: List[str] = [""]
+
+        # Breadth-first waves: every directory of a level is fetched concurrently, and the pages are
+        # parsed on this thread, so visited/layers need no locking
+        with ThreadPoolExecutor(max_workers=_CGIT_WORKERS) as executor:
+            while frontier:
+                wave = [p for p in dict.fromkeys(frontier) if p not in visited]
+                visited.update(wave)
+                frontier = []
+
+                for prefix, html in zip(wave, executor.map(fetch, wave)):
+                    if html is None:
+                        continue
 
-                if prefix == "":
-                    if "/" not in p:
-                        stack.append(p)
-                    else:
-                        head = p.split("/", 1)[0]
-                        if head and head not in visited:
-                            stack.append(head)
-                else:
-                    if p.startswith(prefix.rstrip("/") + "/"):
-                        tail = p[len(prefix.rstrip("/")) + 1:]
-                        if "/" not in tail:
-                            stack.append(p)
+                    plain_paths = {m.group(1) for m in _RE_PLAIN_HREF.finditer(html)}  # files
+                    dir_prefix = prefix.rstrip("/") + "/" if prefix else ""
+
+                    # Single pass over the tree links; repeats are harmless (layers is a set and
+                    # the next wave drops duplicate and visited directories)
+                    for m in _RE_TREE_HREF.finditer(html):
+                        p = m.group(1)
+                        if _CONF_TARGET in p and p.endswith(_CONF_TARGET):
+                            layer_dir = p[:-_CONF_TARGET_LEN].rstrip("/")
+                            if layer_dir:
+                                layers.add(layer_dir)
+                            continue
+                        if dir_prefix and not p.startswith(dir_prefix):
+                            continue
+                        if p in plain_paths:
+                            continue
+                        slash = p.rfind("/")
+                        if slash >= 0 and p.find(".", slash + 1) >= 0:
+                            continue  # last component looks like a file name
+
+                        if not dir_prefix:
+                            if slash < 0:
+                                frontier.append(p)
+                            else:
+                                head = p[:p.find("/")]
+                                if head and head not in visited:
+                                    frontier.append(head)
+                        elif p.find("/", len(dir_prefix)) < 0:
+                            frontier.append(p)  # direct child of this directory
 
         return sorted(layers)
 
     # ---------- Fast cgit detector (auth-aware) ----------
     def _looks_like_cgit(self, parsed, project: Optional[str]) -> bool:
         base = f"{parsed.scheme}://{parsed.netloc}"
+        host_key = (parsed.scheme, parsed.netloc.lower())
+        if _CGIT_HOSTS.get(host_key):
+            return True  # once a host served cgit, every repo on it is scanned as cgit
+        probe_key = (host_key, project)
+        if probe_key in _CGIT_PROBES:
+            return _CGIT_PROBES[probe_key]
         hdrs = self._auth_html_header
 
         def ok(_html: str) -> bool:
             return bool(_CGIT_META.search(_html) or _CGIT_CSS.search(_html) or _CGIT_ID.search(_html))
 
-        try:
-            if project:
-                for h in ("master", "main"):
-                    try:
-                        html = self._http_html.get_text(f"{base}/{project.strip('/')}/tree/?h={h}", hdrs)
-                        if ok(html):
-                            return True
-                    except Exception:  # noqa
-                        continue
+        def probe(url: str) -> bool:
+            try:
+                return ok(self._http_html.get_text(url, hdrs))
+            except Exception:  # noqa
                 return False
-            else:
-                html = self._http_html.get_text(base + "/", hdrs)
-                return ok(html)
-        except Exception:  # noqa
-            return False
+
+        if project:
+            # Both default-branch probes in flight at once; the first positive answer wins
+            urls = [f"{base}/{project.strip('/')}/tree/?h={h}" for h in ("master", "main")]
+            executor = ThreadPoolExecutor(max_workers=len(urls))
+            try:
+                result = any(f.result() for f in as_completed([executor.submit(probe, u) for u in urls]))
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            result = probe(base + "/")
+
+        _CGIT_PROBES[probe_key] = result
+        if result:
+            _CGIT_HOSTS[host_key] = True
+        return result
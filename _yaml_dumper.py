@@ -1,10 +1,21 @@
 from typing import Any
 import yaml
 
+try:
+    # libyaml-backed emitter; much faster than the pure-Python one
+    from yaml import CSafeDumper as _BaseDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _BaseDumper
 
-class YamlDumper(yaml.SafeDumper):
+
+class YamlDumper(_BaseDumper):
     """YAML dumper that renders None as an empty scalar (no 'null')."""
 
+    def ignore_aliases(self, data: Any) -> bool:
+        # kas configs are plain trees; never emit &id/*id anchors, and skip the per-node
+        # id() bookkeeping the base representer does to detect shared objects.
+        return True
+
 
 def _represent_none(dumper: yaml.SafeDumper, _: Any):
     # Empty scalar for nulls -> prints as "key:" with no value
@@ -0,0 +1,61 @@
+import http.client
+import time
+import urllib.parse
+
+import pytest
+
+from _http_client import ConnectionPool, HostThrottle, HttpClient
+
+
+def test_clients_sharing_a_throttle_back_off_together():
+    throttle = HostThrottle()
+    first = HttpClient(throttle=throttle)
+    second = HttpClient(throttle=throttle)
+
+    first._throttle.defer("api.example.com", 0.2)
+    start = time.monotonic()
+    second._throttle.wait("api.example.com")
+    assert time.monotonic() - start >= 0.15
+
+    start = time.monotonic()
+    second._throttle.wait("other.example.com")
+    assert time.monotonic() - start < 0.1
+
+
+def test_throttle_caps_concurrent_requests_per_host():
+    throttle = HostThrottle(max_per_host=2)
+    slot = throttle.slot("api.example.com")
+    assert slot is throttle.slot("api.example.com")
+    assert slot.acquire(blocking=False) and slot.acquire(blocking=False)
+    assert not slot.acquire(blocking=False)
+    assert throttle.slot("other.example.com").acquire(blocking=False)
+
+
+class _DroppedConnection:
+    def request(self, *args, **kwargs):
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+
+    def close(self):
+        pass
+
+
+class _StalePool(ConnectionPool):
+    """Hands out a reused (stale) connection first, then fresh ones; all of them are dropped."""
+
+    def __init__(self):
+        super().__init__()
+        self.acquired = 0
+
+    def acquire(self, scheme, host, port, timeout):
+        self.acquired += 1
+        return _DroppedConnection(), self.acquired == 1
+
+
+@pytest.mark.parametrize("method, attempts", [("GET", 2), ("PUT", 2), ("POST", 1), ("PATCH", 1)])
+def test_only_idempotent_methods_are_replayed_on_a_stale_connection(method, attempts):
+    pool = _StalePool()
+    client = HttpClient(pool=pool)
+    parts = urllib.parse.urlsplit("https://api.example.com/x")
+    with pytest.raises(http.client.RemoteDisconnected):
+        client._send_pooled(method, parts, {}, b"{}")
+    assert pool.acquired == attempts
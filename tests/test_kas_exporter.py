@@ -0,0 +1,53 @@
+import _kas_exporter
+from _http_client import HttpRequestError
+from _kas_exporter import KASExporter
+from _repo_manifest_parser import RepoManifestParser
+
+_MANIFEST = """\
+<manifest>
+  <remote name="origin" fetch="https://example.com/"/>
+  <default remote="origin" revision="main"/>
+  <project name="meta-demo"/>
+</manifest>
+"""
+
+
+def test_transient_discovery_failure_is_retried_on_next_export(monkeypatch):
+    calls = []
+
+    def scan(url, refspec):
+        calls.append((url, refspec))
+        if len(calls) == 1:
+            raise HttpRequestError(url, 503, "Service Unavailable")
+        return ["meta-demo"]
+
+    monkeypatch.setattr(_kas_exporter, "_scan_layers", scan)
+    monkeypatch.setattr(_kas_exporter, "_LAYER_CACHE", {})
+    exporter = KASExporter(RepoManifestParser().parse_string(_MANIFEST), include_all_layers=True)
+
+    first = exporter.generate_kas_configuration()
+    assert "layers" not in first
+    second = exporter.generate_kas_configuration()
+
+    assert calls == [("https://example.com/meta-demo", "main")] * 2
+    assert "    layers:\n      meta-demo:" in second
+
+
+def test_deterministic_discovery_failure_is_cached_with_its_type(monkeypatch):
+    calls = []
+
+    def scan(url, refspec):
+        calls.append(url)
+        raise HttpRequestError(url, 404, "Not Found", "no such repo")
+
+    monkeypatch.setattr(_kas_exporter, "_scan_layers", scan)
+    monkeypatch.setattr(_kas_exporter, "_LAYER_CACHE", {})
+
+    for _ in range(2):
+        try:
+            _kas_exporter._discover_layers("https://example.com/gone", "main")
+        except HttpRequestError as exc:
+            assert exc.status == 404
+        else:
+            raise AssertionError("expected HttpRequestError")
+    assert calls == ["https://example.com/gone"]
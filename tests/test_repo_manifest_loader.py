@@ -0,0 +1,29 @@
+import os
+import warnings
+
+import pygit2
+
+from _repo_manifest_loader import load_manifest_from_file
+
+
+def test_includes_of_a_manifest_in_a_git_repo_are_validated(tmp_path):
+    repo_dir = tmp_path / "manifests"
+    pygit2.init_repository(str(repo_dir))
+    outside = tmp_path / "outside.xml"
+    outside.write_text('<manifest><project name="c"/></manifest>')
+    os.symlink(outside, repo_dir / "linked.xml")
+    (repo_dir / "inc.xml").write_text('<manifest><project name="b"/></manifest>')
+    (repo_dir / "default.xml").write_text(
+        '<manifest><remote name="o" fetch="https://example.com/"/><default remote="o"/>'
+        '<project name="a"/><include name="inc.xml"/><include name="linked.xml"/></manifest>'
+    )
+
+    # The parser lists includes as plain names; validation must accept them
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        md = load_manifest_from_file(str(repo_dir / "default.xml"))
+
+    assert md["includes"] == ["inc.xml", "linked.xml"]
+    messages = [str(w.message) for w in caught]
+    assert any("linked.xml" in m and "outside the repository root" in m for m in messages)
+    assert not any("inc.xml'" in m for m in messages)
@@ -4,19 +4,27 @@
 from __future__ import annotations
 
 import argparse
+import functools
+import os
 import sys
 from pathlib import Path
-from typing import Sequence
+from typing import Callable, Sequence, TextIO
 
-from _kas_exporter import KASExporter
-from _repo_manifest_loader import (
-    LibGitError,
-    load_manifest_from_file,
-    load_manifest_from_git,
+
+# (argparse dest, KASExporter keyword) for the options passed straight through
+_EXPORTER_OPTIONS = (
+    ("kas_version", "version"),
+    ("path_prefix", "path_prefix"),
+    ("path_dedup", "path_dedup"),
+    ("path_apply_mode", "path_apply_mode"),
+    ("include_all_layers", "include_all_layers"),
 )
 
 
+@functools.lru_cache(maxsize=1)
 def _build_parser() -> argparse.ArgumentParser:
+    # Built once per process; parse_args() leaves the parser (and its list defaults) untouched,
+    # so repeated main(argv) calls from scripts can share it.
     parser = argparse.ArgumentParser(
         description=(
             "Export a repo XML manifest (local file or remote git) into a kas YAML file."
@@ -50,6 +58,27 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Keep the temporary git checkout on disk when using --repo-url.",
     )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=1,
+        help="History depth to clone when using --repo-url (default: 1, only the tip is read).",
+    )
+    parser.add_argument(
+        "--no-shallow",
+        action="store_true",
+        help="Clone the full history instead (same as --depth 0).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of cached mirrors and parsed manifests for --repo-url "
+             "(default: $KAS_MANIFEST_CACHE, if set).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the manifest cache and load from the remote.",
+    )
     parser.add_argument(
         "--version",
         dest="kas_version",
@@ -88,19 +117,45 @@ def _build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Include every detected layer for each repo.",
     )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=["yaml", "json"],
+        default="yaml",
+        help="Output format; kas reads both, JSON is quicker to write but has no source comment.",
+    )
     parser.add_argument(
         "-o",
         "--output",
-        help="Write kas YAML to a file instead of stdout.",
+        help="Write the kas configuration to a file instead of stdout.",
     )
 
     return parser
 
 
+def _check_args(args: argparse.Namespace) -> None:
+    """Reject bad option combinations up front, before any clone or network traffic."""
+    if args.manifest_file and args.manifest_filename:
+        raise ValueError("--manifest-filename cannot be used with --manifest-file")
+    if args.include_layer:
+        from _kas_exporter import _parse_include_layer
+
+        for entry in args.include_layer:
+            _parse_include_layer(entry)
+    if args.output:
+        out_dir = os.path.dirname(os.path.abspath(args.output))
+        if not os.path.isdir(out_dir):
+            raise ValueError(f"Output directory does not exist: {out_dir}")
+        if not os.access(out_dir, os.W_OK):
+            raise ValueError(f"Output directory is not writable: {out_dir}")
+
+
 def _load_manifest(args: argparse.Namespace) -> dict:
+    from _repo_manifest_loader import load_manifest_from_file, load_manifest_from_git
+
     if args.manifest_file:
-        if args.manifest_filename:
-            raise ValueError("--manifest-filename cannot be used with --manifest-file")
+        # Repeated main(argv) calls in one process are served by RepoManifestParser's parse
+        # cache, which checks the file content and every included file before reusing a parse.
         return load_manifest_from_file(args.manifest_file)
 
     return load_manifest_from_git(
@@ -109,46 +164,104 @@ def _load_manifest(args: argparse.Namespace) -> dict:
         manifest_filename=args.manifest_filename,
         workdir=args.workdir,
         keep_checkout=args.keep_checkout,
+        cache_dir="" if args.no_cache else args.cache_dir,
+        depth=0 if args.no_shallow else args.depth,
     )
 
 
+def _temp_sibling(out_path: Path) -> Path:
+    # Same directory, so os.replace() is an atomic rename; the pid keeps concurrent runs apart
+    return out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+
+
 def _write_output(path: str, content: str) -> None:
+    # Encode once as UTF-8 (the encoding the YAML path writes too) and write the bytes in one call
+    out_path = Path(path)
+    tmp_path = _temp_sibling(out_path)
+    try:
+        tmp_path.write_bytes(content.encode("utf-8"))
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _stream_output(path: str, emit: Callable[[TextIO], None]) -> None:
+    """Run 'emit' against a buffered file that replaces 'path' only once it has fully succeeded."""
     out_path = Path(path)
-    out_path.write_text(content)
+    tmp_path = _temp_sibling(out_path)
+    try:
+        # UTF-8 and "\n" regardless of locale/platform, the same bytes _write_output produces
+        with tmp_path.open("w", buffering=1 << 20, encoding="utf-8", newline="\n") as fh:
+            emit(fh)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _write_stdout(content: str) -> None:
+    out = sys.stdout
+    buffer = getattr(out, "buffer", None)
+    if buffer is None:  # e.g. replaced by a StringIO
+        out.write(content)
+        return
+    # Encode once and hand the bytes to the binary layer, skipping TextIOWrapper's chunking
+    data = content.encode(out.encoding or "utf-8", out.errors or "strict")
+    out.flush()  # anything already written as text (e.g. progress lines) goes first
+    buffer.write(data)
+    buffer.flush()
 
 
 def main(argv: Sequence[str] | None = None) -> int:
     parser = _build_parser()
     args = parser.parse_args(argv)
 
+    try:
+        _check_args(args)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    # Imported only now: pygit2 and the YAML/HTTP stacks are most of the start-up time,
+    # and --help or a usage error needs none of them.
+    from _kas_exporter import KASExporter
+    from _repo_manifest_loader import LibGitError
+
     try:
         manifest = _load_manifest(args)
     except (ValueError, FileNotFoundError, LibGitError) as exc:
         print(f"Error: {exc}", file=sys.stderr)
         return 1
 
+    options = vars(args)
     exporter = KASExporter(
         manifest,
-        version=args.kas_version,
-        path_prefix=args.path_prefix,
-        path_dedup=args.path_dedup,
-        path_apply_mode=args.path_apply_mode,
-        include_layers=args.include_layer,
-        include_all_layers=args.include_all_layers,
+        # Immutable (and hashable) from here on; also detaches it from argparse's default list
+        include_layers=tuple(args.include_layer) or None,
+        **{kw: options[dest] for dest, kw in _EXPORTER_OPTIONS},
     )
 
     try:
-        kas_yaml = exporter.generate_kas_configuration()
+        if args.output_format == "json":
+            rendered = exporter.generate_kas_configuration_json()
+        elif args.output:
+            # YAML is dumped straight into the file: no full-document str is ever built
+            _stream_output(args.output, exporter.generate_kas_configuration_to)
+            return 0
+        else:
+            exporter.generate_kas_configuration_to(sys.stdout)
+            return 0
     except Exception as exc:  # noqa: BLE001 - surfacing message to CLI
         print(f"Error: {exc}", file=sys.stderr)
         return 1
 
+    if not rendered.endswith("\n"):
+        rendered += "\n"
     if args.output:
-        _write_output(args.output, kas_yaml)
+        _write_output(args.output, rendered)
     else:
-        sys.stdout.write(kas_yaml)
-        if not kas_yaml.endswith("\n"):
-            sys.stdout.write("\n")
+        _write_stdout(rendered)
 
     return 0
 